@@ -40,7 +40,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'storages',
-    'news',
+    'news.apps.NewsConfig',
     'users',
     'core',
 ]
@@ -87,6 +87,28 @@ else:
         'default': dj_database_url.config()
     }
 
+# the scraper invalidates cached responses from another process, so production needs a shared cache
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'cache_table'),
+            # every post detail, feed page and scope version is an entry, django's default of 300 would always cull
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 100000))},
+        }
+    }
+
+# resized post images, see news.images
+PROXY_POST_IMAGES = os.environ.get('PROXY_POST_IMAGES', False)
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join(BASE_DIR, 'image_cache'))
+IMAGE_CACHE_MAX_SIZE = int(os.environ.get('IMAGE_CACHE_MAX_SIZE', 512 * 1024 * 1024))
+
 AUTH_USER_MODEL = 'users.UserProfile'
 
 # Password validation
@@ -0,0 +1,80 @@
+import os
+import random
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from news.models import Source, Category, Post, SourceCategory
+
+TEST_PAGES_DIR = os.path.join(os.path.dirname(__file__), 'news_scrapers', 'test_pages')
+
+
+class Rollback(Exception):
+    pass
+
+
+def rolled_back(func):
+    """runs func in a transaction that's rolled back afterwards, so seeded data never persists"""
+
+    result = None
+    try:
+        with transaction.atomic():
+            result = func()
+            raise Rollback
+    except Rollback:
+        pass
+    return result
+
+
+def seed_posts(posts_count, sources_count=10, categories_count=20, batch_size=5000, seed=0, vocabularies=()):
+    """
+    creates posts_count synthetic posts spread randomly over new sources and categories,
+    with timestamps over the past year, and returns the sources and categories.
+    when vocabularies are given each post's text is made of random words from one of them.
+    """
+
+    rng = random.Random(seed)
+    sources = [Source.objects.create(title='Benchmark source %d' % index) for index in range(sources_count)]
+    categories = [Category.objects.create(title='Benchmark category %d' % index)
+                  for index in range(categories_count)]
+
+    def get_text(vocabulary, words_count):
+        return ' '.join(rng.choices(vocabulary, k=words_count)) if vocabulary else ''
+
+    now = timezone.now()
+    for start in range(0, posts_count, batch_size):
+        posts = []
+        for index in range(start, min(start + batch_size, posts_count)):
+            vocabulary = rng.choice(vocabularies) if vocabularies else ()
+            posts.append(Post(slug='benchmark-post-%d' % index, source=rng.choice(sources),
+                              category=rng.choice(categories),
+                              title=('Benchmark post %d ' % index) + get_text(vocabulary, 8),
+                              description=get_text(vocabulary, 20),
+                              body='<p>%s</p>' % get_text(vocabulary, 40) if vocabulary else '',
+                              detail_url='https://example.com/news/%d' % index,
+                              timestamp=now - timezone.timedelta(seconds=rng.randrange(365 * 24 * 60 * 60))))
+        Post.objects.bulk_create(posts)
+
+    SourceCategory.objects.bulk_create([SourceCategory(source=source, category=category)
+                                        for source in sources for category in categories])
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('ANALYZE TABLE %s' % Post._meta.db_table)
+        else:
+            cursor.execute('ANALYZE %s' % Post._meta.db_table)
+
+    return sources, categories
+
+
+def explain(queryset):
+    if connection.vendor == 'postgresql':
+        return queryset.explain(analyze=True)
+    return queryset.explain()
+
+
+def get_test_page_path(scraper, page):
+    """the path of the saved listing or detail page of an html scraper, e.g youm7_listing.html"""
+
+    name = scraper.__class__.__module__.rsplit('.', 1)[-1].replace('_scraper', '')
+    return os.path.join(TEST_PAGES_DIR, '%s_%s.html' % (name, page))
@@ -0,0 +1,151 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+POST_COUNTS_SCOPE = 'post-counts'
+CATEGORIES_SCOPE = 'categories'
+SOURCES_SCOPE = 'sources'
+
+
+def get_category_scope(category_slug):
+    return 'category:%s' % category_slug
+
+
+def get_source_scope(source_slug):
+    return 'source:%s' % source_slug
+
+
+def get_source_category_scope(source_slug, category_slug):
+    return 'source:%s:category:%s' % (source_slug, category_slug)
+
+
+def get_post_scope(post_slug):
+    return 'post:%s' % post_slug
+
+
+def get_favourites_scope(user_pk):
+    return 'favourites:%s' % user_pk
+
+
+def get_posts_scopes(source, category):
+    """the scopes that change when new posts of a source in a category are saved"""
+
+    return (POST_COUNTS_SCOPE, get_category_scope(category.slug), get_source_scope(source.slug),
+            get_source_category_scope(source.slug, category.slug))
+
+
+def get_version_key(scope):
+    # scopes can hold long or non ascii slugs, which database and memcached keys can't
+    return 'version:' + hashlib.md5(scope.encode()).hexdigest()
+
+
+def get_versions(scopes):
+    """
+    the current version of each scope, keys cached against them are stale once it's bumped.
+    versions are the times in nanoseconds they were last bumped or first used, so if one
+    is evicted from the cache it doesn't restart at a version that older keys were cached with.
+    """
+
+    keys = [get_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+
+    missing_versions = {key: time.time_ns() for key in keys if key not in versions}
+    if missing_versions:
+        cache.set_many(missing_versions, None)
+        versions.update(missing_versions)
+
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*scopes):
+    """sets the versions of the scopes to the current time, always moving them forward"""
+
+    keys = [get_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    now = time.time_ns()
+    cache.set_many({key: max(now, versions.get(key, 0) + 1) for key in keys}, None)
+
+
+class CachedResponseMixin:
+    """
+    caches the data of the GET responses anonymous users get without a cursor, as they're
+    the same for all of them, for cache_timeout seconds or until one of the view's cache
+    scopes is bumped. views with cache_per_user cache each authenticated user's responses instead.
+    """
+
+    cache_timeout = 60 * 60
+    cache_scopes = ()
+    cache_per_user = False
+
+    def get_cache_scopes(self):
+        return self.cache_scopes
+
+    def get_response_cache_key(self, request):
+        if not hasattr(self, '_response_cache_key'):
+            scopes = self.get_cache_scopes()
+            # the host is part of the key as the responses have absolute urls
+            key_parts = [request.build_absolute_uri('/'), request.user.pk, sorted(self.kwargs.items()),
+                         sorted(request.query_params.lists()), scopes, get_versions(scopes)]
+            self._response_cache_key = 'response:%s:%s' % (self.__class__.__name__,
+                                                           hashlib.md5(repr(key_parts).encode()).hexdigest())
+
+        return self._response_cache_key
+
+    def is_response_cacheable(self, request):
+        cursor_query_param = getattr(self.paginator, 'cursor_query_param', None)
+        return request.user.is_authenticated == self.cache_per_user \
+            and cursor_query_param not in request.query_params
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_response_cacheable(request):
+            return super().get(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        return response
+
+
+class ConditionalResponseMixin:
+    """
+    answers GET requests whose If-None-Match or If-Modified-Since headers match the view's
+    cache scopes with 304 Not Modified, without querying the database. the etag covers the
+    versions of the scopes and the request's url, host, format and user, and the last modified
+    time is when one of the scopes was last bumped, so the scopes must cover every change
+    to the response. authenticated users' responses also depend on their favourites.
+    """
+
+    def get_conditional_scopes(self, request):
+        scopes = tuple(self.get_cache_scopes())
+        if request.user.is_authenticated:
+            scopes += (get_favourites_scope(request.user.pk),)
+        return scopes
+
+    def get(self, request, *args, **kwargs):
+        versions = get_versions(self.get_conditional_scopes(request))
+        etag_parts = [request.build_absolute_uri(), request.accepted_renderer.format, request.user.pk, versions]
+        etag = quote_etag(hashlib.md5(repr(etag_parts).encode()).hexdigest())
+        # http dates are in seconds, so a change later in the same second wouldn't be after the
+        # last modified time a client got, it's only used once its second has passed
+        last_modified = max(versions) // 10 ** 9 if versions else None
+        if last_modified is not None and last_modified >= time.time_ns() // 10 ** 9:
+            last_modified = None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+
+        if 200 <= response.status_code < 300:
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
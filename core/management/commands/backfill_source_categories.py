@@ -0,0 +1,25 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+
+from core.cache import SOURCES_SCOPE, bump_versions
+from news.models import Post, SourceCategory
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the categories of each source, with their posts counts and latest timestamps, from the posts'
+
+    def handle(self, *args, **options):
+        pairs = Post.objects.order_by().values('source', 'category') \
+            .annotate(posts_count=Count('pk'), latest_timestamp=Max('timestamp'))
+
+        with transaction.atomic():
+            SourceCategory.objects.all().delete()
+            source_categories = SourceCategory.objects.bulk_create([
+                SourceCategory(source_id=pair['source'], category_id=pair['category'],
+                               posts_count=pair['posts_count'], latest_timestamp=pair['latest_timestamp'])
+                for pair in pairs
+            ], batch_size=1000)
+
+        bump_versions(SOURCES_SCOPE)
+        self.stdout.write('Saved %d source categories' % len(source_categories))
@@ -0,0 +1,66 @@
+import re
+import timeit
+
+from bs4 import BeautifulSoup
+from django.core.management import BaseCommand, CommandError
+
+from core import news_scrapers
+from core.benchmarks import get_test_page_path
+from core.news_scrapers.html_scraper import HtmlNewsScraper
+
+POST_SELECTORS = ('title', 'url', 'description', 'thumbnail', 'timestamp')
+
+
+def legacy_find(container, tag_name, attr_name, attr_value):
+    """the per call lookup the html scraper used before selectors were compiled"""
+
+    attrs = {}
+    if attr_name and attr_value:
+        attrs = {attr_name: re.compile(attr_value + '.*')}
+
+    return container.find(tag_name, attrs)
+
+
+class Command(BaseCommand):
+    help = 'Times per container extraction on a saved listing page, compiled selectors vs per call lookups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scraper', help='scraper class name, e.g. Youm7Scraper')
+        parser.add_argument('listing_page', nargs='?',
+                            help='path of a saved listing page of that scraper, defaults to its test page')
+        parser.add_argument('--repeat', type=int, default=100)
+
+    def handle(self, *args, **options):
+        scraper = next((scraper for scraper in news_scrapers.scrapers
+                        if scraper.__class__.__name__ == options['scraper']), None)
+        if not isinstance(scraper, HtmlNewsScraper):
+            raise CommandError('%s is not an html scraper' % options['scraper'])
+
+        with open(options['listing_page'] or get_test_page_path(scraper, 'listing'), 'rb') as page_file:
+            page = BeautifulSoup(page_file.read(), 'lxml')
+
+        post_containers = []
+        for posts_list_container in scraper.get_posts_list_containers(page):
+            post_containers.extend(scraper.get_post_containers(posts_list_container))
+
+        def extract_legacy():
+            for post_container in post_containers:
+                for name in POST_SELECTORS:
+                    legacy_find(post_container, getattr(scraper, name + '_tag_name'),
+                                getattr(scraper, name + '_attr_name'), getattr(scraper, name + '_attr_value'))
+
+        selectors = [getattr(scraper, name + '_selector') for name in POST_SELECTORS]
+
+        def extract_compiled():
+            for post_container in post_containers:
+                for selector in selectors:
+                    selector.find(post_container)
+
+        repeat = options['repeat']
+        legacy_time = timeit.timeit(extract_legacy, number=repeat) / repeat / len(post_containers)
+        compiled_time = timeit.timeit(extract_compiled, number=repeat) / repeat / len(post_containers)
+
+        self.stdout.write('%d post containers, %d selectors each' % (len(post_containers), len(selectors)))
+        self.stdout.write('per call lookups:   %.1f us per container' % (legacy_time * 1e6))
+        self.stdout.write('compiled selectors: %.1f us per container' % (compiled_time * 1e6))
+        self.stdout.write('speedup: %.2fx' % (legacy_time / compiled_time))
@@ -0,0 +1,63 @@
+import timeit
+
+from django.core.management import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.benchmarks import rolled_back, seed_posts, explain
+from news.models import Post
+from news.pagination import TimeStampCursorPagination
+from news.views import PostsListView, CategoryPostsView, SourcePostsView, PostDetailView
+
+
+class Command(BaseCommand):
+    help = 'Seeds synthetic posts in a rolled back transaction, then prints the plans and timings ' \
+           'of the news views and scraper queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rolled_back(lambda: self.benchmark(options['posts'], options['repeat']))
+
+    def benchmark(self, posts_count, repeat):
+        self.stdout.write('seeding %d posts' % posts_count)
+        sources, categories = seed_posts(posts_count)
+        source, category = sources[0], categories[0]
+
+        page_size = TimeStampCursorPagination.page_size
+        request = Request(APIRequestFactory().get('/'))
+        category_posts = CategoryPostsView(request=request, kwargs={'category': category.slug})
+        category_posts = category_posts.filter_queryset(category_posts.get_queryset()).order_by('-timestamp')
+        source_posts = SourcePostsView(request=request, kwargs={'source': source.slug, 'category': category.slug})
+        source_posts = source_posts.filter_queryset(source_posts.get_queryset()).order_by('-timestamp')
+        favourites_feed = PostsListView.queryset.filter(category_id__in=[category.pk for category in categories[:3]]) \
+            .order_by('-timestamp')
+        middle_timestamp = category_posts[posts_count // len(categories) // 2].timestamp
+        detail_urls = list(Post.objects.filter(source=source, category=category)
+                           .values_list('detail_url', flat=True)[:page_size])
+
+        queries = (
+            ('category posts, first page', category_posts[:page_size + 1]),
+            ('category posts, later page', category_posts.filter(timestamp__lt=middle_timestamp)[:page_size + 1]),
+            ('source posts, first page', source_posts[:page_size + 1]),
+            ('favourites feed, first page', favourites_feed[:page_size + 1]),
+            ('source categories', source.categories.all()),
+            ('post detail', PostDetailView.queryset.filter(slug='benchmark-post-%d' % (posts_count // 2))),
+            ('known urls', Post.objects.filter(source=source, category=category, detail_url__in=detail_urls)
+             .order_by().values_list('detail_url', flat=True)),
+            ('known urls index warm up', Post.objects.filter(source=source).order_by()
+             .values_list('category_id', 'detail_url')),
+        )
+
+        for name, queryset in queries:
+            elapsed_time = timeit.timeit(lambda: list(queryset.all()), number=repeat) / repeat
+
+            self.stdout.write('\n%s: %.2f ms' % (name, elapsed_time * 1000))
+            self.stdout.write(explain(queryset))
+
+        counted_queries = (('category posts count', category_posts), ('source posts count', source_posts))
+        for name, queryset in counted_queries:
+            elapsed_time = timeit.timeit(lambda: queryset.count(), number=repeat) / repeat
+            self.stdout.write('\n%s: %.2f ms' % (name, elapsed_time * 1000))
@@ -0,0 +1,69 @@
+import time
+import timeit
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmarks import rolled_back, seed_posts
+from news.models import Post
+from news.pagination import RankCursorPagination
+from news.search import get_search_backend, search_posts
+from news.views import PostsListView
+
+ENGLISH_WORDS = ('economy', 'markets', 'stocks', 'election', 'president', 'congress', 'senate', 'court',
+                 'police', 'weather', 'storm', 'football', 'season', 'players', 'health', 'vaccine',
+                 'hospital', 'schools', 'students', 'energy', 'prices', 'oil', 'banks', 'growth',
+                 'technology', 'company', 'workers', 'city', 'border', 'security', 'report', 'officials')
+ARABIC_WORDS = ('الاقتصاد', 'البورصة', 'الأسعار', 'الرئيس', 'الحكومة', 'البرلمان', 'المحكمة', 'الشرطة',
+                'الطقس', 'الأمطار', 'الكرة', 'الدوري', 'اللاعبين', 'الصحة', 'اللقاح', 'المستشفى',
+                'المدارس', 'الطلاب', 'الطاقة', 'البترول', 'البنوك', 'النمو', 'التكنولوجيا', 'الشركة',
+                'العمال', 'القاهرة', 'مصر', 'الحدود', 'الأمن', 'تقرير', 'مسؤولين', 'وزير')
+
+QUERIES = ('economy', 'stock markets', 'president election court', 'vaccines', 'zebra',
+           'الاقتصاد', 'اسعار البترول', 'وزير الصحة مصر', 'المدرسة')
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Seeds synthetic english and arabic posts and their search index in a rolled back transaction, ' \
+           'then times search queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if not get_search_backend():
+            raise CommandError('%s has no search index' % connection.vendor)
+
+        rolled_back(lambda: self.benchmark(options['posts'], options['repeat']))
+
+    def benchmark(self, posts_count, repeat):
+        self.stdout.write('seeding %d posts' % posts_count)
+        seed_posts(posts_count, vocabularies=(ENGLISH_WORDS, ARABIC_WORDS))
+
+        backend = get_search_backend()
+        posts = Post.objects.filter(slug__startswith='benchmark-post-').order_by() \
+            .only('title', 'description', 'body').iterator(chunk_size=BATCH_SIZE)
+
+        start_time = time.perf_counter()
+        with connection.cursor() as cursor:
+            batch = []
+            for post in posts:
+                batch.append(post)
+                if len(batch) == BATCH_SIZE:
+                    backend.index_posts(cursor, batch)
+                    batch = []
+            backend.index_posts(cursor, batch)
+        elapsed_time = time.perf_counter() - start_time
+        self.stdout.write('indexed in %.1f s, %.0f posts per second' % (elapsed_time, posts_count / elapsed_time))
+
+        page_size = RankCursorPagination.page_size
+        for query in QUERIES:
+            results = search_posts(PostsListView.queryset, query).order_by(*RankCursorPagination.ordering)
+            first_page_time = timeit.timeit(lambda: list(results[:page_size + 1]), number=repeat) / repeat
+            count_time = timeit.timeit(lambda: results.count(), number=repeat) / repeat
+
+            self.stdout.write('%s: first page %.2f ms, %d matches counted in %.2f ms' % (
+                query, first_page_time * 1000, results.count(), count_time * 1000))
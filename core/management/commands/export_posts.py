@@ -0,0 +1,30 @@
+from django.core.management import BaseCommand, CommandError
+
+from news.export import get_exported_posts, export_posts, parse_since
+
+
+class Command(BaseCommand):
+    help = 'Exports posts as newline delimited json, oldest first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='only export posts newer than this iso 8601 timestamp')
+        parser.add_argument('--source', help='slug of the source to export posts of')
+        parser.add_argument('--category', help='slug of the category to export posts of')
+        parser.add_argument('--output', help='file to write to, defaults to stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_since(options['since']) if options['since'] else None
+        except ValueError as error:
+            raise CommandError(error)
+
+        posts = get_exported_posts(since, options['source'], options['category'])
+        if not options['output']:
+            for chunk in export_posts(posts, options['chunk_size']):
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            for chunk in export_posts(posts, options['chunk_size']):
+                output.write(chunk)
@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from news.models import PostTombstone
+from news.sync import TOMBSTONES_RETENTION
+
+
+class Command(BaseCommand):
+    help = 'Deletes the tombstones of posts deleted longer ago than the sync tokens are valid for'
+
+    def handle(self, *args, **options):
+        deleted, _ = PostTombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONES_RETENTION).delete()
+        self.stdout.write('Deleted %d tombstones' % deleted)
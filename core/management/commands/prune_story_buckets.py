@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from news.clustering import STORY_WINDOW
+from news.models import StoryBucket
+
+
+class Command(BaseCommand):
+    help = 'Deletes the story buckets of posts older than the window new posts are clustered with'
+
+    def handle(self, *args, **options):
+        deleted, _ = StoryBucket.objects.filter(created_at__lt=timezone.now() - STORY_WINDOW).delete()
+        self.stdout.write('Deleted %d story buckets' % deleted)
@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+
+from news.models import Post
+from news.search import SEARCH_TABLE, get_search_backend
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the posts search index from the stored posts'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if not backend:
+            self.stdout.write('%s has no search index' % connection.vendor)
+            return
+
+        posts = Post.objects.order_by().only('title', 'description', 'body').iterator(chunk_size=BATCH_SIZE)
+        indexed_posts = 0
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % SEARCH_TABLE)
+
+            batch = []
+            for post in posts:
+                batch.append(post)
+                if len(batch) == BATCH_SIZE:
+                    backend.index_posts(cursor, batch)
+                    indexed_posts += len(batch)
+                    batch = []
+            backend.index_posts(cursor, batch)
+            indexed_posts += len(batch)
+
+        self.stdout.write('Indexed %d posts' % indexed_posts)
@@ -1,22 +1,72 @@
 import datetime
 import signal
+import time
+import traceback
 
+from apscheduler.executors.pool import ProcessPoolExecutor
 from apscheduler.schedulers.background import BackgroundScheduler
 from django.core.management import BaseCommand
+from django.db import connections, close_old_connections
 
 from core import news_scrapers
 
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', action='store_true',
+                            help='run each source in its own worker process instead of a thread')
+        parser.add_argument('--interval', type=int, default=1,
+                            help='minutes between runs of a source, each run only polls its due categories')
+
     def handle(self, *args, **options):
-        scheduler = BackgroundScheduler()
-        scheduler.start()
+        # overdue runs of a source are merged into one and never overlap a running one
+        scheduler = BackgroundScheduler(job_defaults={'coalesce': True, 'max_instances': 1,
+                                                      'misfire_grace_time': options['interval'] * 60})
+
         for scraper in news_scrapers.scrapers:
-            scheduler.add_job(scrape, "interval", minutes=5, args=(scraper,), next_run_time=datetime.datetime.now())
+            executor = 'default'
+            if options['processes']:
+                # a single long lived worker per source keeps the scraper's in memory state between runs
+                executor = scraper.__class__.__name__
+                scheduler.add_executor(ProcessPoolExecutor(max_workers=1), alias=executor)
+
+            scheduler.add_job(scrape, "interval", minutes=options['interval'], executor=executor,
+                              args=(scraper.__class__.__name__,), next_run_time=datetime.datetime.now())
+
+        # forked workers must open their own database connections
+        connections.close_all()
+        scheduler.start()
 
         signal.pause()
 
 
-def scrape(scraper):
+def get_scraper(name):
+    return next(scraper for scraper in news_scrapers.scrapers if scraper.__class__.__name__ == name)
+
+
+def scrape(scraper_name):
+    scraper = get_scraper(scraper_name)
     print("starting scraping " + scraper.title)
-    scraper.scrape()
+
+    close_old_connections()
+    started_at = time.monotonic()
+    posts = []
+    failed = False
+    try:
+        posts = scraper.scrape()
+    except Exception:
+        traceback.print_exc()
+        failed = True
+    finally:
+        close_old_connections()
+
+    summary = {
+        'source': scraper.title,
+        'duration': time.monotonic() - started_at,
+        'pages': scraper.fetcher.pages,
+        'new_posts': len(posts),
+        'errors': scraper.errors + failed,
+    }
+    print('Finished scraping %(source)s in %(duration).1fs: %(pages)d pages, '
+          '%(new_posts)d new posts, %(errors)d errors' % summary)
+    return summary
@@ -1,36 +1,75 @@
 import re
-import time
 from abc import ABC
 
-import dateparser
 import pytz
-import requests
 from bs4 import BeautifulSoup
 
-from news.models import Source, Post, PostTag, Category
+from core.news_scrapers.fetcher import Fetcher
+from core.news_scrapers.ingest import ingest_posts
+from core.news_scrapers.page_cache import ListingPageCache, PageNotModified
+from core.news_scrapers.polling import PollingSchedule
+from core.news_scrapers.selectors import Selector, make_strainer
+from core.news_scrapers.timestamps import TimestampParser
+from core.news_scrapers.url_index import KnownUrlIndex
+from news.models import Source, Post, Category, Stylesheet
 
 
 class BaseNewsScraper(ABC):
-    def __init__(self, title, base_url, categories, time_between_requests=0,
-                 max_scraped_pages=1, timezone='EET', body_tag_name='',
-                 body_attr_name='', body_attr_value=''):
+    def __init__(self, title, base_url, categories, requests_per_second=4,
+                 max_concurrent_requests=4, max_scraped_pages=1, timezone='EET',
+                 body_tag_name='', body_attr_name='', body_attr_value='', targeted_parsing=True,
+                 timestamp_parser=None, min_poll_interval=60, max_poll_interval=60 * 60):
         self.title = title
         self.base_url = base_url
         self.categories = categories
-        self.time_between_requests = time_between_requests
         self.timezone = timezone
         self.max_scraped_pages = max_scraped_pages
-        self.session = requests.session()
+        self.fetcher = Fetcher(requests_per_second=requests_per_second,
+                               max_concurrent_requests=max_concurrent_requests)
+        self.known_urls = KnownUrlIndex()
+        self.listing_cache = ListingPageCache()
         self.body_tag_name = body_tag_name  # usually div or article
         self.body_attr_name = body_attr_name
         self.body_attr_value = body_attr_value
+        self.body_selector = Selector(body_tag_name, body_attr_name, body_attr_value)
+        self.targeted_parsing = targeted_parsing  # only build the parts of pages that the scraper reads
+        self.timestamp_parser = timestamp_parser or TimestampParser()
+        self.polling_schedule = PollingSchedule(min_interval=min_poll_interval,
+                                                max_interval=max_poll_interval)
+        self.errors = 0
 
     def scrape(self):
+        self.errors = 0
+        self.fetcher.reset_stats()
+        self.listing_cache.reset_stats()
+        self.timestamp_parser.reset_stats()
+
         source = Source.objects.get_or_create(title=self.title, website=self.base_url)[0]
+        self.known_urls.warm(source)
+
         posts = []
+        polled_categories = 0
         for category, url in self.categories.items():
+            if not self.polling_schedule.is_due(category):
+                continue
+
             url = self.get_category_url(category, url)
-            posts.extend(self.scrape_category(source, category, url))
+            category_posts = self.scrape_category(source, category, url)
+            self.polling_schedule.record(category, len(category_posts))
+            polled_categories += 1
+
+            posts.extend(category_posts)
+
+        print('Polled %d of %d categories from %s' % (polled_categories, len(self.categories), self.title))
+        print('Fetched %d pages from %s in %.1fs (%.2f pages/sec)' % (
+            self.fetcher.pages, self.title, self.fetcher.get_elapsed_time(),
+            self.fetcher.get_pages_per_second()))
+        print('Skipped %d of %d unchanged listing pages from %s (%.0f%% hit rate, %d not modified)' % (
+            self.listing_cache.not_modified + self.listing_cache.unchanged, self.listing_cache.requests,
+            self.title, self.listing_cache.get_hit_rate() * 100, self.listing_cache.not_modified))
+        print('Parsed %d timestamps from %s (%.0f%% without dateparser, %d cached)' % (
+            self.timestamp_parser.requests, self.title, self.timestamp_parser.get_fast_path_ratio() * 100,
+            self.timestamp_parser.cache_hits))
         return posts
 
     def scrape_category(self, source, title, url):
@@ -40,11 +79,14 @@ class BaseNewsScraper(ABC):
         category_posts = []
         while has_next and page_index <= self.get_max_scraped_pages(title):  # won't scrape more than 3 pages by default
             try:
-                time.sleep(self.time_between_requests)
                 page = self.get_page_at_index(url, page_index)
                 page_posts, has_next = self.scrape_page(source, category, url, page)
+                self.listing_cache.commit((url, page_index))
+            except PageNotModified:
+                break
             except AssertionError:
                 print("Error Parsing Page")
+                self.errors += 1
                 continue
             finally:
                 page_index += 1
@@ -53,31 +95,43 @@ class BaseNewsScraper(ABC):
         return category_posts
 
     def scrape_page(self, source, category, category_url, page):
-        posts = []
-
+        post_containers = []
         for posts_list_container in self.get_posts_list_containers(page):
-            for post_container in self.get_post_containers(posts_list_container):
+            post_containers.extend(self.get_post_containers(posts_list_container))
+
+        urls = [self.get_post_url(post_container, category_url) for post_container in post_containers]
+
+        # posts are listed newest first, so the first known post ends the new ones
+        has_next = True
+        for index, url in enumerate(urls):
+            if (category.pk, url) in self.known_urls:
+                post_containers, urls = post_containers[:index], urls[:index]
+                has_next = False
+                break
+
+        scraped_posts = []
+        # detail pages are downloaded ahead in the fetcher's thread pool while posts are parsed in order
+        detailed_post_containers = self.fetcher.imap(self.get_post_detailed_container, urls)
+        try:
+            for post_container, url, detailed_post_container in zip(post_containers, urls,
+                                                                    detailed_post_containers):
                 try:
-                    post, tags = self.scrape_post(source, category, category_url, post_container)
+                    scraped_posts.append(self.scrape_post(source, category, post_container, url,
+                                                          detailed_post_container))
                 except AssertionError:
                     print("Error Parsing Post")
-                    continue
+                    self.errors += 1
+        finally:
+            detailed_post_containers.close()
 
-                if Post.objects.filter(source=source, category=category, detail_url=post.detail_url):
-                    return posts, False
-                posts.append(post)
-                post.save()
+        posts = ingest_posts(source, category, scraped_posts)
+        for post in posts:
+            self.known_urls.add(category.pk, post.detail_url)
 
-                post.tags.set(tags)
+        return posts, has_next
 
-        return posts, True
-
-    def scrape_post(self, source, category, category_url, post_container):
+    def scrape_post(self, source, category, post_container, url, detailed_post_container):
         title = self.get_post_title(post_container)
-        url = self.get_post_url(post_container, category_url)
-
-        time.sleep(self.time_between_requests)
-        detailed_post_container = self.get_post_detailed_container(url)
 
         description = self.get_post_description(post_container, detailed_post_container)
         thumbnail = self.get_post_thumbnail(post_container, detailed_post_container)
@@ -85,17 +139,16 @@ class BaseNewsScraper(ABC):
 
         print('Scraped post from: ' + source.title + ' in category: ' + category.title + ' with title: ' + title)
 
-        body = self.get_post_body(detailed_post_container)
-        if body:
-            body = self.format_post_body(*body)
+        body, styles = self.get_post_body(detailed_post_container)
+        body = self.format_post_body(body, styles)
+        stylesheet = Stylesheet(hash=Stylesheet.get_hash(styles), content=styles) if body and styles else None
 
         timestamp = self.get_post_utc_timestamp(post_container, detailed_post_container)
-        tags = [PostTag.objects.get_or_create(tag=tag)[0]
-                for tag in self.get_post_tags(post_container, detailed_post_container)]
+        tags = self.get_post_tags(post_container, detailed_post_container)
 
         post = Post(source=source, category=category, title=title, thumbnail=thumbnail,
                     full_image=full_image, detail_url=url, description=description,
-                    timestamp=timestamp, body=body)
+                    timestamp=timestamp, body=body, stylesheet=stylesheet)
 
         return post, tags
 
@@ -108,6 +161,21 @@ class BaseNewsScraper(ABC):
     def get_page_at_index(self, url, index):
         raise NotImplementedError()
 
+    def fetch_page_at_index(self, url, index, method='GET', **kwargs):
+        """
+        downloads a listing page with a conditional request,
+        raises PageNotModified if it didn't change since it was last scraped
+        """
+
+        key = (url, index)
+        headers = self.listing_cache.get_conditional_headers(key) if method == 'GET' else {}
+        headers.update(kwargs.pop('headers', {}))
+
+        response = self.fetcher.request(method, self.get_page_url_at_index(url, index),
+                                        headers=headers, **kwargs)
+        self.listing_cache.check(key, response)
+        return response
+
     def get_page_url_at_index(self, url, index):
         raise NotImplementedError()
 
@@ -132,16 +200,20 @@ class BaseNewsScraper(ABC):
     def get_post_full_image(self, post_container, detailed_post_container):
         raise NotImplementedError()
 
+    def parse_html(self, content, selectors):
+        parse_only = make_strainer(selectors) if self.targeted_parsing else None
+        return BeautifulSoup(content, 'lxml', parse_only=parse_only)
+
+    def get_detail_page_selectors(self):
+        return [self.body_selector, Selector('link', 'rel', 'stylesheet'), Selector('style')]
+
     def get_post_detailed_container(self, url):
-        return BeautifulSoup(self.session.get(url).content, 'lxml')
+        return self.parse_html(self.fetcher.get(url).content, self.get_detail_page_selectors())
 
     def get_post_body(self, post_page):
-        attrs = {}
-        if self.body_attr_name and self.body_attr_value:
-            attrs = {self.body_attr_name: re.compile(self.body_attr_value + '.*')}
-
-        post_body = post_page.find(self.body_tag_name, attrs) or ''
-        style_tags = post_page.find_all('link')
+        post_body = self.body_selector.find(post_page) or ''
+        # only the stylesheets, other links like canonical or amphtml differ for every article
+        style_tags = post_page.find_all('link', rel='stylesheet')
         style_tags.extend(post_page.find_all('style'))
 
         styles = ''
@@ -159,16 +231,8 @@ class BaseNewsScraper(ABC):
 
             [tag.extract() for tag in body.select("br:last-child") or []]
 
-            full_body = body.prettify()
-
-            required_style = '<style>:not(head) {background-color: white;} ' \
-                             'img, video, iframe {display: block; margin: auto; max-width: 100%; ' \
-                             'object-fit: scale-down;} </style>'
-
-            meta_tag = '<meta name="viewport" content="width=device-width, initial-scale=1.0, user-scalable=no">'
-
-            return '<!DOCTYPE html><html>' + meta_tag + '<head>' + styles + required_style + '</head>' \
-                   + '<body dir=\"auto\">' + full_body + '</body></html>'
+            # prettify only ends with a new line when the tag has a next sibling, which parse_only may have dropped
+            return body.prettify().rstrip('\n')
         else:
             return ''
 
@@ -178,7 +242,7 @@ class BaseNewsScraper(ABC):
         if not timestamp:
             return None
 
-        parsed_timestamp = dateparser.parse(timestamp)
+        parsed_timestamp = self.timestamp_parser.parse(timestamp)
 
         if self.timezone:
             tz = pytz.timezone(self.timezone)
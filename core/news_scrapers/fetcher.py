@@ -0,0 +1,117 @@
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate  # tokens added per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher:
+    """fetches pages concurrently while rate limiting the requests sent to each host"""
+
+    def __init__(self, requests_per_second=0, max_concurrent_requests=1):
+        self.requests_per_second = requests_per_second
+        self.max_concurrent_requests = max(max_concurrent_requests, 1)
+        self.session = requests.session()
+
+        adapter = HTTPAdapter(pool_maxsize=self.max_concurrent_requests)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.buckets = {}
+        self.buckets_lock = threading.Lock()
+        self.executor = None
+
+        self.pages = 0
+        self.started_at = time.monotonic()
+        self.stats_lock = threading.Lock()
+
+    def get_bucket(self, url):
+        if not self.requests_per_second:
+            return None
+
+        host = urlparse(url).netloc
+        with self.buckets_lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.requests_per_second,
+                                                 capacity=self.max_concurrent_requests)
+            return self.buckets[host]
+
+    def request(self, method, url, **kwargs):
+        bucket = self.get_bucket(url)
+        if bucket:
+            bucket.acquire()
+
+        response = self.session.request(method, url, **kwargs)
+
+        with self.stats_lock:
+            self.pages += 1
+
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def imap(self, func, items):
+        """
+        lazily maps func over items in the thread pool, keeping at most
+        max_concurrent_requests calls in flight and yielding results in order.
+        closing the generator cancels the calls that didn't start yet.
+        """
+
+        if not self.executor:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent_requests)
+
+        items = iter(items)
+        pending = deque(self.executor.submit(func, item)
+                        for item in itertools.islice(items, self.max_concurrent_requests))
+        try:
+            while pending:
+                future = pending.popleft()
+                for item in itertools.islice(items, 1):
+                    pending.append(self.executor.submit(func, item))
+                yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.pages = 0
+            self.started_at = time.monotonic()
+
+    def get_elapsed_time(self):
+        return time.monotonic() - self.started_at
+
+    def get_pages_per_second(self):
+        elapsed = self.get_elapsed_time()
+        return self.pages / elapsed if elapsed else 0
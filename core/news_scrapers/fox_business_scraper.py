@@ -1,6 +1,5 @@
-import re
-
 from core.news_scrapers.html_scraper import HtmlNewsScraper
+from core.news_scrapers.timestamps import TimestampParser
 
 
 class FoxBusinessScraper(HtmlNewsScraper):
@@ -20,12 +19,11 @@ class FoxBusinessScraper(HtmlNewsScraper):
                          timestamp_attr_value='time', tags_tag_name='span',
                          tags_attr_name='class', tags_attr_value='pill-text',
                          body_tag_name='div', body_attr_name='class',
-                         body_attr_value='article-body', timezone='UTC', max_scraped_pages=1)
+                         body_attr_value='article-body', timezone='UTC', max_scraped_pages=1,
+                         timestamp_parser=TimestampParser(formats=('%B %d, %Y',)))
 
     def get_post_tags(self, post_container, detailed_post_container):
-        tag = post_container.find(self.tags_tag_name,
-                                  {self.tags_attr_name:
-                                       re.compile(self.tags_attr_value + '.*')})
+        tag = self.tags_selector.find(post_container)
 
         return [tag.text.strip()] if tag else []
 
@@ -1,6 +1,7 @@
 from urllib.parse import urljoin
 
 from core.news_scrapers.json_scraper import JsonNewsScraper
+from core.news_scrapers.timestamps import TimestampParser
 
 
 class FoxNewsScraper(JsonNewsScraper):
@@ -11,7 +12,9 @@ class FoxNewsScraper(JsonNewsScraper):
                          title_json_name='title', description_json_name='description',
                          thumbnail_json_name='imageUrl', url_json_name='url',
                          timestamp_json_name='publicationDate', body_attr_value='article-body',
-                         body_tag_name='div', body_attr_name='class', timezone='UTC')
+                         body_tag_name='div', body_attr_name='class', timezone='UTC',
+                         timestamp_parser=TimestampParser(formats=('%Y-%m-%dT%H:%M:%S%z',
+                                                                   '%Y-%m-%dT%H:%M:%S.%f%z')))
 
     def get_post_tags(self, post_container, detailed_post_container):
         return [post_container.get('category', {}).get('name', ''), ]
@@ -1,9 +1,7 @@
-import re
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
-
 from core.news_scrapers.base_scraper import BaseNewsScraper
+from core.news_scrapers.selectors import Selector
 
 
 class HtmlNewsScraper(BaseNewsScraper):
@@ -47,70 +45,65 @@ class HtmlNewsScraper(BaseNewsScraper):
         self.tags_attr_name = tags_attr_name
         self.tags_attr_value = tags_attr_value
 
+        # selectors are compiled once here instead of on every call
+        self.list_container_selector = Selector(list_container_tag_name, list_container_attr_name,
+                                                list_container_attr_value)
+        self.container_selector = Selector(container_tag_name, container_attr_name, container_attr_value)
+        self.title_selector = Selector(title_tag_name, title_attr_name, title_attr_value)
+        self.description_selector = Selector(description_tag_name, description_attr_name,
+                                             description_attr_value)
+        self.thumbnail_selector = Selector(thumbnail_tag_name, thumbnail_attr_name, thumbnail_attr_value)
+        self.full_image_selector = Selector(full_image_tag_name, full_image_attr_name, full_image_attr_value)
+        self.timestamp_selector = Selector(timestamp_tag_name, timestamp_attr_name, timestamp_attr_value)
+        self.url_selector = Selector(url_tag_name, url_attr_name, url_attr_value)
+        self.tags_selector = Selector(tags_tag_name, tags_attr_name, tags_attr_value)
+
     def get_category_url(self, title, url):
         return urljoin(self.base_url, url)
 
     def get_page_at_index(self, url, index):
-        response = self.session.get(self.get_page_url_at_index(url, index))
+        response = self.fetch_page_at_index(url, index)
 
         assert response.status_code == 200
-        return BeautifulSoup(response.content, 'lxml')
+        return self.parse_html(response.content, self.get_listing_page_selectors())
+
+    def get_listing_page_selectors(self):
+        return [self.list_container_selector]
+
+    def get_detail_page_selectors(self):
+        return super().get_detail_page_selectors() + [self.full_image_selector, self.tags_selector]
 
     def get_page_url_at_index(self, url, index):
         raise NotImplementedError()
 
     def get_posts_list_containers(self, page):
-        attrs = {}
-        if self.list_container_attr_name and self.list_container_attr_value:
-            attrs = {self.list_container_attr_name: re.compile(self.list_container_attr_value + '.*')}
-
-        containers = page.find_all(self.list_container_tag_name, attrs)
+        containers = self.list_container_selector.find_all(page)
 
         assert containers
         return containers
 
     def get_post_containers(self, posts_list_container):
-        attrs = {}
-        if self.container_attr_name and self.container_attr_value:
-            attrs = {self.container_attr_name: re.compile(self.container_attr_value + '.*')}
-
-        containers = posts_list_container.find_all(self.container_tag_name, attrs)
+        containers = self.container_selector.find_all(posts_list_container)
 
         assert containers
         return containers
 
     def get_post_title(self, post_container):
-        attrs = {}
-        if self.title_attr_name and self.title_attr_value:
-            attrs = {self.title_attr_name: re.compile(self.title_attr_value + '.*')}
-
-        title = post_container.find(self.title_tag_name, attrs)
+        title = self.title_selector.find(post_container)
         return title.text.strip() if title else ''
 
     def get_post_url(self, post_container, category_url):
-        attrs = {}
-        if self.url_attr_name and self.url_attr_value:
-            attrs = {self.url_attr_name: re.compile(self.url_attr_value + '.*')}
-
-        url = post_container.find(self.url_tag_name, attrs)['href']
+        url = self.url_selector.find(post_container)['href']
 
         return urljoin(self.base_url, url)
 
     def get_post_description(self, post_container, detailed_post_container):
-        attrs = {}
-        if self.description_attr_name and self.description_attr_value:
-            attrs = {self.description_attr_name: re.compile(self.description_attr_value + '.*')}
-
-        description = post_container.find(self.description_tag_name, attrs)
+        description = self.description_selector.find(post_container)
 
         return description.text.strip() if description else ''
 
     def get_post_thumbnail(self, post_container, detailed_post_container):
-        attrs = {}
-        if self.thumbnail_attr_name and self.thumbnail_attr_value:
-            attrs = {self.thumbnail_attr_name: re.compile(self.thumbnail_attr_value + '.*')}
-
-        thumbnail = post_container.find(self.thumbnail_tag_name, attrs)['src']
+        thumbnail = self.thumbnail_selector.find(post_container)['src']
 
         if thumbnail.startswith('http://'):
             thumbnail = thumbnail.replace('http://', 'https://')
@@ -118,11 +111,7 @@ class HtmlNewsScraper(BaseNewsScraper):
         return urljoin(self.base_url, thumbnail)
 
     def get_post_full_image(self, post_container, detailed_post_container):
-        attrs = {}
-        if self.full_image_attr_name and self.full_image_attr_value:
-            attrs = {self.full_image_attr_name: re.compile(self.full_image_attr_value + '.*')}
-
-        full_image = detailed_post_container.find(self.full_image_tag_name, attrs)
+        full_image = self.full_image_selector.find(detailed_post_container)
 
         if not full_image:
             return ''
@@ -135,19 +124,11 @@ class HtmlNewsScraper(BaseNewsScraper):
         return urljoin(self.base_url, full_image)
 
     def get_post_timestamp(self, post_container, detailed_post_container):
-        attrs = {}
-        if self.timestamp_attr_name and self.timestamp_attr_value:
-            attrs = {self.timestamp_attr_name: re.compile(self.timestamp_attr_value + '.*')}
-
-        return post_container.find(self.timestamp_tag_name, attrs).text.strip()
+        return self.timestamp_selector.find(post_container).text.strip()
 
     def get_post_tags(self, post_container, detailed_post_container):
         tags = []
-        attrs = {}
-        if self.tags_attr_name and self.tags_attr_value:
-            attrs = {self.tags_attr_name: re.compile(self.tags_attr_value + '.*')}
-
-        tags_container = detailed_post_container.find(self.tags_tag_name, attrs)
+        tags_container = self.tags_selector.find(detailed_post_container)
 
         if tags_container:
             for tag in tags_container.find_all('a'):
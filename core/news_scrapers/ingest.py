@@ -0,0 +1,134 @@
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from core.cache import bump_versions, get_posts_scopes
+from core.utils import allocate_unique_slugs
+from news.clustering import cluster_posts
+from news.images import register_images
+from news.models import Post, PostTag, Stylesheet, SourceCategory
+from news.search import index_posts
+
+
+def get_known_urls(source, category, urls):
+    return set(Post.objects.filter(source=source, category=category, detail_url__in=urls).order_by()
+               .values_list('detail_url', flat=True))
+
+
+def get_or_create_tags(tag_names):
+    """returns a dict mapping each tag name to its PostTag pk, creating the missing tags in bulk"""
+
+    if not tag_names:
+        return {}
+
+    tags = dict(PostTag.objects.filter(tag__in=tag_names).values_list('tag', 'pk'))
+
+    missing_tag_names = tag_names - tags.keys()
+    if missing_tag_names:
+        PostTag.objects.bulk_create([PostTag(tag=tag_name) for tag_name in missing_tag_names],
+                                    ignore_conflicts=True)
+        tags.update(PostTag.objects.filter(tag__in=missing_tag_names).values_list('tag', 'pk'))
+
+    return tags
+
+
+def get_or_create_stylesheets(stylesheets):
+    """returns a dict mapping each stylesheet hash to its Stylesheet pk, creating the missing ones in bulk"""
+
+    stylesheets = {stylesheet.hash: stylesheet for stylesheet in stylesheets}
+    if not stylesheets:
+        return {}
+
+    stylesheets_ids = dict(Stylesheet.objects.filter(hash__in=stylesheets.keys()).values_list('hash', 'pk'))
+
+    missing_hashes = stylesheets.keys() - stylesheets_ids.keys()
+    if missing_hashes:
+        Stylesheet.objects.bulk_create([stylesheets[stylesheet_hash] for stylesheet_hash in missing_hashes],
+                                       ignore_conflicts=True)
+        stylesheets_ids.update(Stylesheet.objects.filter(hash__in=missing_hashes).values_list('hash', 'pk'))
+
+    return stylesheets_ids
+
+
+def create_posts(posts, attempts=3):
+    """bulk creates the posts, allocating their slugs again if a concurrent writer took one of them"""
+
+    for attempt in range(attempts):
+        slugs = allocate_unique_slugs(Post.objects.all(), [post.title for post in posts])
+        for post, slug in zip(posts, slugs):
+            post.slug = slug
+
+        try:
+            with transaction.atomic():
+                return Post.objects.bulk_create(posts)
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
+
+
+def update_source_category(source, category, posts):
+    """adds the new posts to their source category's count and latest timestamp, creating it on its first posts"""
+
+    timestamps = [post.timestamp for post in posts if post.timestamp]
+    latest_timestamp = max(timestamps) if timestamps else None
+
+    updates = {'posts_count': F('posts_count') + len(posts)}
+    if latest_timestamp:
+        latest_timestamp_value = Value(latest_timestamp, output_field=models.DateTimeField())
+        updates['latest_timestamp'] = Greatest(Coalesce('latest_timestamp', latest_timestamp_value),
+                                               latest_timestamp_value)
+
+    if not SourceCategory.objects.filter(source=source, category=category).update(**updates):
+        SourceCategory.objects.create(source=source, category=category, posts_count=len(posts),
+                                      latest_timestamp=latest_timestamp)
+
+
+def ingest_posts(source, category, scraped_posts):
+    """
+    saves a page of scraped (post, tag names) pairs using a fixed number of queries,
+    posts whose detail url is already stored or repeated within the page are dropped.
+    """
+
+    detail_urls = get_known_urls(source, category, [post.detail_url for post, tag_names in scraped_posts])
+
+    posts = []
+    posts_tag_names = []
+    for post, tag_names in scraped_posts:
+        if post.detail_url in detail_urls:
+            continue
+        detail_urls.add(post.detail_url)
+        posts.append(post)
+        posts_tag_names.append({tag_name for tag_name in tag_names if tag_name})
+
+    if not posts:
+        return []
+
+    with transaction.atomic():
+        tags = get_or_create_tags(set().union(*posts_tag_names))
+
+        stylesheets_ids = get_or_create_stylesheets([post.stylesheet for post in posts if post.stylesheet])
+        for post in posts:
+            if post.stylesheet:
+                post.stylesheet_id = stylesheets_ids[post.stylesheet.hash]
+
+        create_posts(posts)
+
+        if any(post.pk is None for post in posts):  # backends that can't return ids from bulk inserts
+            posts_ids = dict(Post.objects.filter(slug__in=[post.slug for post in posts])
+                             .values_list('slug', 'pk'))
+            for post in posts:
+                post.pk = posts_ids[post.slug]
+
+        through_model = Post.tags.through
+        through_model.objects.bulk_create([through_model(post_id=post.pk, posttag_id=tags[tag_name])
+                                           for post, tag_names in zip(posts, posts_tag_names)
+                                           for tag_name in tag_names])
+
+        update_source_category(source, category, posts)
+        index_posts(posts)
+        cluster_posts(category, posts)
+        register_images(posts)
+
+    bump_versions(*get_posts_scopes(source, category))
+
+    return posts
@@ -1,8 +1,6 @@
 import json
 from urllib.parse import urljoin
 
-import requests
-
 from core.news_scrapers.base_scraper import BaseNewsScraper
 
 
@@ -24,7 +22,7 @@ class JsonNewsScraper(BaseNewsScraper):
         raise NotImplementedError()
 
     def get_page_at_index(self, url, index):
-        return json.loads(requests.get(self.get_page_url_at_index(url, index)).content)
+        return json.loads(self.fetch_page_at_index(url, index).content)
 
     def get_page_url_at_index(self, url, index):
         raise NotImplementedError()
@@ -0,0 +1,66 @@
+import hashlib
+
+
+class PageNotModified(Exception):
+    pass
+
+
+class ListingPageCache:
+    """
+    remembers the validators and body hash of each listing page, so unchanged
+    pages can be skipped before they are parsed.
+    an entry is only kept once its page was scraped successfully.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.pending_entries = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.unchanged = 0
+
+    def get_conditional_headers(self, key):
+        entry = self.entries.get(key)
+        headers = {}
+
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        return headers
+
+    def check(self, key, response):
+        """raises PageNotModified if the response's page is the same one that was scraped last time"""
+
+        self.requests += 1
+        entry = self.entries.get(key)
+
+        if response.status_code == 304 and entry:
+            self.not_modified += 1
+            raise PageNotModified()
+
+        if response.status_code != 200:
+            return
+
+        content_hash = hashlib.sha1(response.content).hexdigest()
+        if entry and entry['hash'] == content_hash:
+            self.unchanged += 1
+            raise PageNotModified()
+
+        self.pending_entries[key] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'hash': content_hash,
+        }
+
+    def commit(self, key):
+        if key in self.pending_entries:
+            self.entries[key] = self.pending_entries.pop(key)
+
+    def reset_stats(self):
+        self.requests = self.not_modified = self.unchanged = 0
+
+    def get_hit_rate(self):
+        return (self.not_modified + self.unchanged) / self.requests if self.requests else 0
@@ -0,0 +1,51 @@
+import time
+
+
+class PollingSchedule:
+    """
+    decides when each category of a source should be polled again from the rate
+    it publishes at, an exponential moving average of the new posts found per second.
+    categories are polled about once per target_new_posts new posts, within the
+    min and max intervals, and backed off when a poll finds nothing new.
+    """
+
+    def __init__(self, min_interval=60, max_interval=60 * 60, initial_interval=5 * 60,
+                 target_new_posts=3, smoothing=0.3, backoff=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.target_new_posts = target_new_posts
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.categories = {}
+
+    def is_due(self, category, now=None):
+        now = time.monotonic() if now is None else now
+        state = self.categories.get(category)
+        return not state or now >= state['polled_at'] + state['interval']
+
+    def record(self, category, new_posts, now=None):
+        now = time.monotonic() if now is None else now
+        state = self.categories.get(category)
+
+        if not state:
+            self.categories[category] = {'polled_at': now, 'interval': self.initial_interval, 'rate': None}
+            return
+
+        rate = new_posts / max(now - state['polled_at'], 1)
+        if state['rate'] is None:
+            state['rate'] = rate
+        else:
+            state['rate'] = self.smoothing * rate + (1 - self.smoothing) * state['rate']
+
+        if new_posts:
+            interval = self.target_new_posts / state['rate'] if state['rate'] else self.max_interval
+        else:
+            interval = state['interval'] * self.backoff
+
+        state['interval'] = min(max(interval, self.min_interval), self.max_interval)
+        state['polled_at'] = now
+
+    def get_interval(self, category):
+        state = self.categories.get(category)
+        return state['interval'] if state else 0
@@ -0,0 +1,61 @@
+import re
+
+from bs4 import SoupStrainer, Tag
+
+
+class Selector:
+    """
+    a tag name and attribute pattern compiled once from a scraper's selector kwargs,
+    it matches tags like find(tag_name, {attr_name: re.compile(attr_value + '.*')}) does
+    without building a SoupStrainer on every call.
+    """
+
+    def __init__(self, tag_name='', attr_name='', attr_value=''):
+        self.tag_name = tag_name
+        self.attr_name = attr_name
+        self.pattern = None
+        if attr_name and attr_value:
+            self.pattern = re.compile(attr_value + '.*')
+
+    def matches(self, tag):
+        return self.matches_tag_data(tag.name, tag.attrs)
+
+    def matches_tag_data(self, name, attrs):
+        if self.tag_name and name != self.tag_name:
+            return False
+
+        if not self.pattern:
+            return True
+
+        return self.matches_value(attrs.get(self.attr_name))
+
+    def matches_value(self, value):
+        if value is None:
+            return False
+
+        if isinstance(value, (list, tuple)):  # multi valued attributes like class
+            return any(self.pattern.search(item) for item in value) or \
+                   bool(self.pattern.search(' '.join(value)))
+
+        return bool(self.pattern.search(value))
+
+    def find(self, container):
+        for tag in container.descendants:
+            if isinstance(tag, Tag) and self.matches(tag):
+                return tag
+        return None
+
+    def find_all(self, container):
+        # like bs4's find_all(''), which matches nothing even though find('') matches any tag
+        if not self.tag_name and not self.pattern:
+            return []
+        return [tag for tag in container.descendants if isinstance(tag, Tag) and self.matches(tag)]
+
+
+def make_strainer(selectors):
+    """
+    returns a SoupStrainer keeping only the tags matched by any of the selectors
+    along with their whole subtrees, to be used as BeautifulSoup's parse_only
+    """
+    return SoupStrainer(lambda name, attrs: any(selector.matches_tag_data(name, attrs)
+                                                for selector in selectors))
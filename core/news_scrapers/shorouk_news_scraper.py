@@ -1,6 +1,6 @@
-from bs4 import BeautifulSoup
-
 from core.news_scrapers.html_scraper import HtmlNewsScraper
+from core.news_scrapers.selectors import Selector
+from core.news_scrapers.timestamps import TimestampParser, ARABIC_DATE_NAMES
 
 
 class ShoroukNewsScraper(HtmlNewsScraper):
@@ -19,16 +19,18 @@ class ShoroukNewsScraper(HtmlNewsScraper):
                          full_image_attr_name='id', full_image_attr_value='Body_Body_imageMain',
                          timestamp_tag_name='span', body_tag_name='div', body_attr_name='class',
                          body_attr_value='eventContent eventContentNone', tags_tag_name='div',
-                         tags_attr_name='class', tags_attr_value='relatedWords')
+                         tags_attr_name='class', tags_attr_value='relatedWords',
+                         timestamp_parser=TimestampParser(formats=('%d %m %Y %I:%M %p',),
+                                                          **ARABIC_DATE_NAMES))
         self.__VIEWSTATE = ''
         self.__VIEWSTATEGENERATOR = ''
         self.__EVENTVALIDATION = ''
 
     def get_page_at_index(self, url, index):
         if index == 1:
-            response = self.session.get(self.get_page_url_at_index(url, index))
+            response = self.fetch_page_at_index(url, index)
         else:
-            response = self.session.post(self.get_page_url_at_index(url, index), data={
+            response = self.fetch_page_at_index(url, index, method='POST', data={
                 '__VIEWSTATE': self.__VIEWSTATE,
                 '__VIEWSTATEGENERATOR': self.__VIEWSTATEGENERATOR,
                 '__EVENTTARGET': 'ctl00$ctl00$Body$Body$AspNetPager',
@@ -38,7 +40,7 @@ class ShoroukNewsScraper(HtmlNewsScraper):
 
         assert response.status_code == 200
 
-        page = BeautifulSoup(response.content, 'lxml')
+        page = self.parse_html(response.content, self.get_listing_page_selectors())
 
         # hidden fields to send in next request
         self.__VIEWSTATE = str(page.find('input', type='hidden', id='__VIEWSTATE')['value'])
@@ -47,6 +49,9 @@ class ShoroukNewsScraper(HtmlNewsScraper):
 
         return page
 
+    def get_listing_page_selectors(self):
+        return super().get_listing_page_selectors() + [Selector('input', 'type', 'hidden')]
+
     def get_page_url_at_index(self, url, index):
         return url
 
@@ -0,0 +1,92 @@
+import re
+from collections import OrderedDict
+from datetime import datetime
+
+import dateparser
+
+ARABIC_DATE_NAMES = {
+    'month_names': {
+        'يناير': 1, 'فبراير': 2, 'مارس': 3, 'أبريل': 4, 'إبريل': 4, 'ابريل': 4, 'مايو': 5,
+        'يونيو': 6, 'يونية': 6, 'يوليو': 7, 'يولية': 7, 'أغسطس': 8, 'اغسطس': 8, 'سبتمبر': 9,
+        'أكتوبر': 10, 'اكتوبر': 10, 'نوفمبر': 11, 'ديسمبر': 12,
+    },
+    'day_names': ('السبت', 'الأحد', 'الاحد', 'الإثنين', 'الاثنين', 'الثلاثاء', 'الأربعاء',
+                  'الاربعاء', 'الخميس', 'الجمعة'),
+    'meridiems': {'ص': 'AM', 'م': 'PM'},
+    'digits': {'٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+               '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9'},
+}
+
+
+class TimestampParser:
+    """
+    parses a scraper's timestamps with datetime.strptime using the formats it declares,
+    falling back to dateparser for anything else.
+    when month, day or meridiem names are given, timestamps are first split into words
+    and those names are replaced by numbers, AM/PM or dropped, e.g
+    'الجمعة، 16 أكتوبر 2020 04:00 م' becomes '16 10 2020 04:00 PM'
+    """
+
+    def __init__(self, formats=(), month_names=None, day_names=(), meridiems=None, digits=None,
+                 cache_size=2048):
+        self.formats = formats
+        self.words = {}
+        self.words.update({name: str(month) for name, month in (month_names or {}).items()})
+        self.words.update({name: '' for name in day_names})
+        self.words.update(meridiems or {})
+        self.digits = str.maketrans(digits or {})
+
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+        self.requests = 0
+        self.cache_hits = 0
+        self.fast_path_hits = 0
+        self.fallbacks = 0
+
+    def normalize(self, timestamp):
+        timestamp = timestamp.translate(self.digits).strip()
+        if not self.words:
+            return timestamp
+
+        words = (self.words.get(word, word) for word in re.split(r'[\s،,]+', timestamp))
+        return ' '.join(word for word in words if word and word != '-')
+
+    def parse(self, timestamp):
+        self.requests += 1
+
+        if timestamp in self.cache:
+            self.cache_hits += 1
+            self.cache.move_to_end(timestamp)
+            return self.cache[timestamp]
+
+        normalized_timestamp = self.normalize(timestamp)
+        parsed_timestamp = None
+        for timestamp_format in self.formats:
+            try:
+                parsed_timestamp = datetime.strptime(normalized_timestamp, timestamp_format)
+                self.fast_path_hits += 1
+                break
+            except ValueError:
+                continue
+
+        if parsed_timestamp is None:
+            self.fallbacks += 1
+            parsed_timestamp = dateparser.parse(timestamp)
+
+            # relative timestamps like '2 hours ago' depend on the time they were parsed at
+            if not re.search(r'\d{4}', normalized_timestamp):
+                return parsed_timestamp
+
+        self.cache[timestamp] = parsed_timestamp
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+        return parsed_timestamp
+
+    def reset_stats(self):
+        self.requests = self.cache_hits = self.fast_path_hits = self.fallbacks = 0
+
+    def get_fast_path_ratio(self):
+        """ratio of the timestamps that didn't need dateparser"""
+        return (self.cache_hits + self.fast_path_hits) / self.requests if self.requests else 0
@@ -0,0 +1,37 @@
+import hashlib
+
+from news.models import Post
+
+
+class KnownUrlIndex:
+    """
+    in memory set of the (category, detail url) pairs already stored for a source,
+    keys are kept as 64 bit digests so the index stays small for large tables.
+    """
+
+    def __init__(self):
+        self.source_id = None
+        self.keys = set()
+
+    @staticmethod
+    def get_key(category_id, url):
+        digest = hashlib.blake2b(('%s:%s' % (category_id, url)).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def warm(self, source):
+        if self.source_id == source.pk:
+            return
+
+        self.keys = {self.get_key(category_id, url) for category_id, url in
+                     Post.objects.filter(source=source).order_by().values_list('category_id', 'detail_url')
+                     .iterator(chunk_size=5000)}
+        self.source_id = source.pk
+
+    def add(self, category_id, url):
+        self.keys.add(self.get_key(category_id, url))
+
+    def __contains__(self, category_url):
+        return self.get_key(*category_url) in self.keys
+
+    def __len__(self):
+        return len(self.keys)
@@ -1,4 +1,6 @@
 from core.news_scrapers.html_scraper import HtmlNewsScraper
+from core.news_scrapers.selectors import Selector
+from core.news_scrapers.timestamps import TimestampParser, ARABIC_DATE_NAMES
 
 
 class Youm7Scraper(HtmlNewsScraper):
@@ -28,11 +30,16 @@ class Youm7Scraper(HtmlNewsScraper):
                          body_attr_name='id', body_attr_value='articleBody',
                          timestamp_tag_name='span', timestamp_attr_name='class',
                          timestamp_attr_value='newsDate', tags_tag_name='div',
-                         tags_attr_name='class', tags_attr_value='tags')
+                         tags_attr_name='class', tags_attr_value='tags',
+                         timestamp_parser=TimestampParser(formats=('%d %m %Y %I:%M %p',),
+                                                          **ARABIC_DATE_NAMES))
 
     def get_page_url_at_index(self, url, index):
         return url.replace('x', str(index))
 
+    def get_detail_page_selectors(self):
+        return super().get_detail_page_selectors() + [Selector('div', 'class', 'img-cont')]
+
     def get_post_full_image(self, post_container, detailed_post_container):
         detailed_post_container = detailed_post_container.find('div', {'class': 'img-cont'})
         return super().get_post_full_image(post_container, detailed_post_container)
@@ -1,11 +1,33 @@
+import hashlib
+import json
 from collections import OrderedDict
 
+from django.core.cache import cache
+from django.db import connections
 from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 
+from core.cache import POST_COUNTS_SCOPE, get_versions
+
 
 class CursorPaginationWithCount(CursorPagination):
+    """
+    cursor pagination that also returns the total count of the paginated queryset.
+    count_strategy decides how it's counted:
+    'exact' counts on every page,
+    'first_page' counts only on the first page and returns a null count for the others,
+    'cached' caches the count of each filtered queryset for count_cache_timeout seconds,
+    or until new posts are ingested and bump the post counts version,
+    'estimate' uses the postgres planner's estimate of the rows, counting exactly when
+    it's less than count_estimate_threshold or on other databases.
+    """
+
+    count_strategy = 'exact'
+    count_cache_timeout = 5 * 60
+    count_estimate_threshold = 100000
+
     def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
         self.get_count(queryset)
         return super().paginate_queryset(queryset, request, view)
 
@@ -38,4 +60,39 @@ class CursorPaginationWithCount(CursorPagination):
         }
 
     def get_count(self, queryset):
-        self.count = queryset.count()
+        self.count = getattr(self, 'get_%s_count' % self.count_strategy)(queryset)
+
+    def get_exact_count(self, queryset):
+        return queryset.count()
+
+    def get_first_page_count(self, queryset):
+        if self.request.query_params.get(self.cursor_query_param):
+            return None
+        return queryset.count()
+
+    def get_cached_count(self, queryset):
+        query_hash = hashlib.md5(str(queryset.order_by().query).encode()).hexdigest()
+        key = 'pagination-count:%s:%s' % (get_versions((POST_COUNTS_SCOPE,))[0], query_hash)
+
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_estimate_count(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return queryset.count()
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate < self.count_estimate_threshold:
+            return queryset.count()
+        return estimate
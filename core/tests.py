@@ -0,0 +1,434 @@
+import itertools
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+import dateparser
+from bs4 import BeautifulSoup
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase
+
+from core.benchmarks import get_test_page_path
+from core.management.commands.benchmark_extraction import legacy_find
+from core.news_scrapers.base_scraper import BaseNewsScraper
+from core.news_scrapers.fetcher import Fetcher, TokenBucket
+from core.news_scrapers.fox_business_scraper import FoxBusinessScraper
+from core.news_scrapers.html_scraper import HtmlNewsScraper
+from core.news_scrapers.ingest import create_posts
+from core.news_scrapers.page_cache import ListingPageCache, PageNotModified
+from core.news_scrapers.polling import PollingSchedule
+from core.news_scrapers.selectors import Selector
+from core.news_scrapers.shorouk_news_scraper import ShoroukNewsScraper
+from core.news_scrapers.timestamps import ARABIC_DATE_NAMES, TimestampParser
+from core.news_scrapers.youm7_scraper import Youm7Scraper
+from core.utils import allocate_unique_slugs
+from news.models import Source, Category, Post
+
+
+class PostBodyTests(SimpleTestCase):
+    def test_only_stylesheets_kept(self):
+        scraper = BaseNewsScraper('Source', 'https://example.com', {}, body_tag_name='article')
+        page = '<html><head><link rel="canonical" href="https://example.com/1"/>' \
+               '<link rel="stylesheet" href="/site.css"/><link rel="alternate" hreflang="ar" href="/ar/1"/>' \
+               '<style>p {color: black;}</style></head><body><article><p>body</p></article></body></html>'
+
+        for targeted_parsing in (True, False):
+            scraper.targeted_parsing = targeted_parsing
+            body, styles = scraper.get_post_body(scraper.parse_html(page, scraper.get_detail_page_selectors()))
+            self.assertEqual(styles, '<link href="/site.css" rel="stylesheet"/><style>p {color: black;}</style>')
+            self.assertEqual(body.p.text, 'body')
+
+
+class AllocateUniqueSlugsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = Source.objects.create(title='Source')
+        cls.category = Category.objects.create(title='Category')
+        for title in ('hello', 'hello-2', 'a' * 10):
+            Post.objects.create(source=cls.source, category=cls.category, title=title,
+                                detail_url='https://example.com/' + title)
+
+    def test_numbered_slugs(self):
+        self.assertEqual(allocate_unique_slugs(Post.objects.all(), ['hello', 'hello', 'hello-2', 'new']),
+                         ['hello-3', 'hello-4', 'hello-2-2', 'new'])
+
+    def test_truncated_slugs(self):
+        self.assertEqual(allocate_unique_slugs(Post.objects.all(), ['a' * 20, 'a' * 20, 'b' * 20], max_length=10),
+                         ['aaaaaaaa-2', 'aaaaaaaa-3', 'bbbbbbbbbb'])
+
+    def test_empty_values(self):
+        slugs = allocate_unique_slugs(Post.objects.all(), ['', None], max_length=10)
+
+        self.assertEqual([len(slug) for slug in slugs], [10, 10])
+        self.assertNotEqual(slugs[0], slugs[1])
+
+    def test_create_posts_retried(self):
+        def allocate_taken_slugs(queryset, values, **kwargs):
+            allocate_slugs.side_effect = allocate_unique_slugs  # a concurrent writer took them the first time
+            return ['hello'] * len(values)
+
+        posts = [Post(source=self.source, category=self.category, title='hello',
+                      detail_url='https://example.com/new')]
+        with mock.patch('core.news_scrapers.ingest.allocate_unique_slugs',
+                        side_effect=allocate_taken_slugs) as allocate_slugs:
+            create_posts(posts)
+
+        self.assertEqual(allocate_slugs.call_count, 2)
+        self.assertEqual(Post.objects.get(detail_url='https://example.com/new').slug, 'hello-3')
+
+    def test_create_posts_attempts(self):
+        posts = [Post(source=self.source, category=self.category, title='hello',
+                      detail_url='https://example.com/new')]
+        with mock.patch('core.news_scrapers.ingest.allocate_unique_slugs', return_value=['hello']) as allocate_slugs:
+            with self.assertRaises(IntegrityError):
+                create_posts(posts)
+
+        self.assertEqual(allocate_slugs.call_count, 3)
+
+
+class TimestampParserTests(SimpleTestCase):
+    def test_fast_path_matches_dateparser(self):
+        samples = [
+            (TimestampParser(formats=('%d %m %Y %I:%M %p',), **ARABIC_DATE_NAMES),
+             ['الجمعة، 16 أكتوبر 2020 04:00 م', '١٦ أكتوبر ٢٠٢٠ - ٠٤:٠٠ م', 'السبت، 3 يناير 2021 11:15 ص']),
+            (TimestampParser(formats=('%B %d, %Y',)), ['October 16, 2020']),
+            (TimestampParser(formats=('%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%dT%H:%M:%S.%f%z')),
+             ['2020-10-16T16:00:00-04:00', '2020-10-16T16:00:00.250Z']),
+        ]
+
+        for parser, timestamps in samples:
+            for timestamp in timestamps:
+                self.assertEqual(parser.parse(timestamp), dateparser.parse(timestamp), timestamp)
+            self.assertEqual(parser.fast_path_hits, len(timestamps))
+            self.assertEqual(parser.fallbacks, 0)
+
+    def test_cached_timestamps(self):
+        parser = TimestampParser(formats=('%B %d, %Y',), cache_size=1)
+        for timestamp in ('October 16, 2020', 'October 16, 2020', 'October 17, 2020', 'October 16, 2020'):
+            parser.parse(timestamp)
+
+        self.assertEqual((parser.requests, parser.cache_hits, parser.fast_path_hits), (4, 1, 3))
+        self.assertEqual(parser.get_fast_path_ratio(), 1)
+
+    def test_relative_timestamps_not_cached(self):
+        parser = TimestampParser(formats=('%B %d, %Y',))
+        for timestamp in ('2 hours ago', '2 hours ago', 'October 16, 2020 4:00 PM'):
+            self.assertIsNotNone(parser.parse(timestamp))
+
+        self.assertEqual((parser.fallbacks, parser.cache_hits), (3, 0))
+        self.assertEqual(list(parser.cache), ['October 16, 2020 4:00 PM'])
+
+
+class ListingPageCacheTests(TestCase):
+    def get_response(self, status_code=200, content=b'<ul></ul>'):
+        return SimpleNamespace(status_code=status_code, content=content,
+                               headers={'ETag': '"1"', 'Last-Modified': 'Fri, 16 Oct 2020 16:00:00 GMT'})
+
+    def test_not_modified_pages(self):
+        listing_cache = ListingPageCache()
+        listing_cache.check('key', self.get_response())
+        self.assertEqual(listing_cache.get_conditional_headers('key'), {})
+
+        listing_cache.commit('key')
+        self.assertEqual(listing_cache.get_conditional_headers('key'),
+                         {'If-None-Match': '"1"', 'If-Modified-Since': 'Fri, 16 Oct 2020 16:00:00 GMT'})
+
+        for response in (self.get_response(304, b''), self.get_response()):
+            with self.assertRaises(PageNotModified):
+                listing_cache.check('key', response)
+        listing_cache.check('key', self.get_response(content=b'<ul><li></li></ul>'))
+
+        self.assertEqual((listing_cache.requests, listing_cache.not_modified, listing_cache.unchanged), (4, 1, 1))
+
+    def test_committed_after_success(self):
+        scraper = BaseNewsScraper('Source', 'https://example.com', {})
+        scraper.fetcher = mock.Mock(**{'request.return_value': self.get_response()})
+        scraper.get_page_url_at_index = lambda url, index: url
+        scraper.get_page_at_index = scraper.fetch_page_at_index
+        scraper.get_max_scraped_pages = lambda title: 1
+        source = Source.objects.create(title='Source')
+
+        # a failed page is downloaded again on the next run
+        scraper.scrape_page = mock.Mock(side_effect=AssertionError)
+        with redirect_stdout(StringIO()):
+            scraper.scrape_category(source, 'Category', 'https://example.com/category')
+        scraper.scrape_page = mock.Mock(return_value=([], False))
+        scraper.scrape_category(source, 'Category', 'https://example.com/category')
+        self.assertEqual(scraper.scrape_page.call_count, 1)
+        self.assertEqual(scraper.fetcher.request.call_args[1]['headers'], {})
+
+        scraper.scrape_category(source, 'Category', 'https://example.com/category')
+        self.assertEqual(scraper.scrape_page.call_count, 1)
+        self.assertEqual(scraper.fetcher.request.call_args[1]['headers']['If-None-Match'], '"1"')
+
+
+class PollingScheduleTests(SimpleTestCase):
+    def test_initial_interval(self):
+        schedule = PollingSchedule()
+        self.assertTrue(schedule.is_due('category', now=0))
+
+        schedule.record('category', 10, now=0)
+        self.assertEqual(schedule.get_interval('category'), 300)
+        self.assertFalse(schedule.is_due('category', now=299))
+        self.assertTrue(schedule.is_due('category', now=300))
+        self.assertTrue(schedule.is_due('other category', now=0))
+
+    def test_publishing_rate(self):
+        schedule = PollingSchedule()
+        schedule.record('category', 0, now=0)
+
+        schedule.record('category', 6, now=300)  # 0.02 posts per second
+        self.assertAlmostEqual(schedule.get_interval('category'), 150)
+
+        schedule.record('category', 2, now=450)  # 0.3 * 2 / 150 + 0.7 * 0.02
+        self.assertAlmostEqual(schedule.get_interval('category'), 3 / 0.018)
+
+    def test_backoff(self):
+        schedule = PollingSchedule()
+        schedule.record('category', 0, now=0)
+        schedule.record('category', 6, now=300)
+
+        schedule.record('category', 0, now=450)
+        self.assertAlmostEqual(schedule.get_interval('category'), 225)
+        schedule.record('category', 0, now=675)
+        self.assertAlmostEqual(schedule.get_interval('category'), 337.5)
+
+    def test_clamped_intervals(self):
+        schedule = PollingSchedule()
+        schedule.record('category', 0, now=0)
+
+        schedule.record('category', 1000, now=300)
+        self.assertEqual(schedule.get_interval('category'), 60)
+
+        now = 300
+        for _ in range(20):
+            now += schedule.get_interval('category')
+            schedule.record('category', 0, now=now)
+        self.assertEqual(schedule.get_interval('category'), 3600)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FetcherTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        time_patch = mock.patch('core.news_scrapers.fetcher.time', self.clock)
+        time_patch.start()
+        self.addCleanup(time_patch.stop)
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        acquired_at = []
+        for _ in range(6):
+            bucket.acquire()
+            acquired_at.append(self.clock.now)
+
+        self.assertEqual(acquired_at, [0, 0, 0.5, 1, 1.5, 2])
+
+    def test_rate_limited_per_host(self):
+        fetcher = Fetcher(requests_per_second=1)
+        fetcher.session.request = mock.Mock(side_effect=lambda method, url, **kwargs: url)
+
+        requested_at = []
+        for url in ('https://a.com/1', 'https://b.com/1', 'https://a.com/2', 'https://b.com/2'):
+            self.assertEqual(fetcher.get(url), url)
+            requested_at.append(self.clock.now)
+
+        self.assertEqual(requested_at, [0, 0, 1, 1])
+        self.assertEqual(fetcher.pages, 4)
+
+    def test_unlimited(self):
+        fetcher = Fetcher()
+        fetcher.session.request = mock.Mock()
+        for _ in range(3):
+            fetcher.get('https://a.com')
+
+        self.assertEqual(self.clock.now, 0)
+        self.assertEqual(fetcher.session.request.call_count, 3)
+
+
+class FetcherMapTests(SimpleTestCase):
+    def test_results_in_order(self):
+        fetcher = Fetcher(max_concurrent_requests=3)
+        results = fetcher.imap(lambda item: time.sleep((6 - item) * 0.002) or item * 10, range(6))
+
+        self.assertEqual(list(results), [0, 10, 20, 30, 40, 50])
+
+    def test_closed_generator_cancels_calls(self):
+        fetcher = Fetcher(max_concurrent_requests=3)
+        fetcher.executor = ThreadPoolExecutor(max_workers=1)
+        started, released = threading.Event(), threading.Event()
+        calls = []
+
+        def fetch(item):
+            calls.append(item)
+            if item == 1:
+                started.set()
+                released.wait()
+            return item
+
+        results = fetcher.imap(fetch, itertools.count())
+        self.assertEqual(next(results), 0)
+        started.wait()
+        results.close()  # 1 is running, the following calls didn't start yet
+        released.set()
+        fetcher.executor.shutdown()
+
+        self.assertEqual(calls, [0, 1])
+
+
+class KnownPostsTests(TestCase):
+    listing_page = '<html><body><ul class="posts">%s</ul></body></html>' % ''.join(
+        '<li><a href="/%d"><h3>Post %d</h3></a><img src="/%d.jpg"/><time>2020-10-16 16:0%d</time></li>'
+        % (index, index, index, index) for index in (3, 2, 1))
+    detail_page = '<html><body><article><p>body</p></article></body></html>'
+
+    def setUp(self):
+        self.scraper = HtmlNewsScraper(title='Source', base_url='https://example.com', categories={},
+                                       list_container_tag_name='ul', list_container_attr_name='class',
+                                       list_container_attr_value='posts', container_tag_name='li',
+                                       title_tag_name='h3', timestamp_tag_name='time', body_tag_name='article',
+                                       tags_tag_name='ul', tags_attr_name='class', tags_attr_value='tags',
+                                       timestamp_parser=TimestampParser(formats=('%Y-%m-%d %H:%M',)))
+        self.scraper.fetcher.session.request = mock.Mock(
+            return_value=SimpleNamespace(status_code=200, content=self.detail_page, headers={}))
+        self.source = Source.objects.create(title='Source')
+        self.category = Category.objects.create(title='Category')
+
+    def scrape_page(self):
+        page = self.scraper.parse_html(self.listing_page, self.scraper.get_listing_page_selectors())
+        with redirect_stdout(StringIO()):
+            return self.scraper.scrape_page(self.source, self.category, 'https://example.com/news', page)
+
+    def get_fetched_urls(self):
+        return sorted(call[0][1] for call in self.scraper.fetcher.session.request.call_args_list)
+
+    def test_stops_at_known_post(self):
+        self.scraper.known_urls.add(self.category.pk, 'https://example.com/2')
+
+        posts, has_next = self.scrape_page()
+        self.assertEqual([post.title for post in posts], ['Post 3'])
+        self.assertFalse(has_next)
+        self.assertEqual(self.get_fetched_urls(), ['https://example.com/3'])
+
+    def test_new_posts_remembered(self):
+        posts, has_next = self.scrape_page()
+        self.assertEqual([post.title for post in posts], ['Post 3', 'Post 2', 'Post 1'])
+        self.assertTrue(has_next)
+
+        self.scraper.fetcher.session.request.reset_mock()
+        self.assertEqual(self.scrape_page(), ([], False))
+        self.assertEqual(self.get_fetched_urls(), [])
+
+
+def legacy_find_all(container, tag_name, attr_name, attr_value):
+    attrs = {}
+    if attr_name and attr_value:
+        attrs = {attr_name: re.compile(attr_value + '.*')}
+
+    return container.find_all(tag_name, attrs)
+
+
+class SelectorTests(SimpleTestCase):
+    page = BeautifulSoup('<div id="paging"><div class="col-xs-12 bigOneSec"><h3>first</h3></div>'
+                         '<div class="col-xs-12"><p class="dek">second</p></div><div class="bigOneSec wide">'
+                         '<img src="/1.jpg"/></div><div class="col-xs-12 bigOneSec ad"><a href="/2">third</a>'
+                         '</div><span>no attributes</span><p class="">empty class</p></div>', 'lxml')
+
+    def assert_same_matches(self, page, tag_name, attr_name, attr_value):
+        selector = Selector(tag_name, attr_name, attr_value)
+        self.assertIs(selector.find(page), legacy_find(page, tag_name, attr_name, attr_value))
+        self.assertEqual(selector.find_all(page), legacy_find_all(page, tag_name, attr_name, attr_value))
+
+    def test_legacy_matches(self):
+        cases = (
+            ('div', 'class', 'col-xs-12 bigOneSec'),  # only matches the joined class value
+            ('div', 'class', 'bigOneSec'),  # matches any single class
+            ('div', 'class', 'col'),
+            ('', 'class', 'dek'),
+            ('', '', ''),
+            ('span', '', ''),
+            ('span', 'class', 'newsDate'),  # no class attribute
+            ('p', 'class', 'missing'),
+            ('div', 'id', 'pag'),
+            ('div', '', 'ignored without attr_name'),
+            ('img', 'src', '/1'),
+        )
+        for tag_name, attr_name, attr_value in cases:
+            with self.subTest(tag_name=tag_name, attr_name=attr_name, attr_value=attr_value):
+                self.assert_same_matches(self.page, tag_name, attr_name, attr_value)
+
+    def test_scrapers_selectors(self):
+        for scraper in (Youm7Scraper(), ShoroukNewsScraper(), FoxBusinessScraper()):
+            for page_name in ('listing', 'detail'):
+                with open(get_test_page_path(scraper, page_name), 'rb') as page_file:
+                    page = BeautifulSoup(page_file.read(), 'lxml')
+
+                for name in ('list_container', 'container', 'title', 'description', 'thumbnail', 'full_image',
+                             'timestamp', 'url', 'tags', 'body'):
+                    with self.subTest(scraper=scraper.title, page=page_name, selector=name):
+                        self.assert_same_matches(page, getattr(scraper, name + '_tag_name'),
+                                                 getattr(scraper, name + '_attr_name'),
+                                                 getattr(scraper, name + '_attr_value'))
+
+
+class TargetedParsingTests(SimpleTestCase):
+    def extract_posts(self, scraper_class, targeted_parsing):
+        """what the scraper's get_* hooks return for its test pages"""
+
+        scraper = scraper_class()
+        scraper.targeted_parsing = targeted_parsing
+        category_url = scraper.get_category_url(*next(iter(scraper.categories.items())))
+        listing_url = scraper.get_page_url_at_index(category_url, 1)
+
+        def request(method, url, **kwargs):
+            with open(get_test_page_path(scraper, 'listing' if url == listing_url else 'detail'), 'rb') as page:
+                return SimpleNamespace(status_code=200, content=page.read(), headers={})
+
+        scraper.fetcher.session.request = request
+
+        posts = []
+        page = scraper.get_page_at_index(category_url, 1)
+        for posts_list_container in scraper.get_posts_list_containers(page):
+            for post_container in scraper.get_post_containers(posts_list_container):
+                url = scraper.get_post_url(post_container, category_url)
+                detailed_post_container = scraper.get_post_detailed_container(url)
+                body, styles = scraper.get_post_body(detailed_post_container)
+
+                posts.append({
+                    'title': scraper.get_post_title(post_container),
+                    'url': url,
+                    'description': scraper.get_post_description(post_container, detailed_post_container),
+                    'thumbnail': scraper.get_post_thumbnail(post_container, detailed_post_container),
+                    'full_image': scraper.get_post_full_image(post_container, detailed_post_container),
+                    'timestamp': scraper.get_post_utc_timestamp(post_container, detailed_post_container),
+                    'tags': scraper.get_post_tags(post_container, detailed_post_container),
+                    'body': scraper.format_post_body(body, styles),
+                    'styles': styles,
+                })
+        return posts
+
+    def test_same_extraction(self):
+        for scraper_class in (Youm7Scraper, ShoroukNewsScraper, FoxBusinessScraper):
+            with self.subTest(scraper=scraper_class.__name__):
+                posts = self.extract_posts(scraper_class, targeted_parsing=False)
+                self.assertEqual(len(posts), 2)
+                for post in posts:
+                    for field in ('title', 'url', 'description', 'thumbnail', 'timestamp', 'body', 'styles'):
+                        self.assertTrue(post[field], field)
+
+                self.assertEqual(self.extract_posts(scraper_class, targeted_parsing=True), posts)
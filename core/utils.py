@@ -2,43 +2,94 @@ import random
 import re
 import string
 
+from django.db.models import Q
 from django.utils.text import slugify
 
+# numbered slugs with longer suffixes than this fall outside the prefix query and are checked one by one
+MAX_SLUG_SUFFIX_LENGTH = 10
+
 
 def generate_random_string(max_length):
     return ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(max_length))
 
 
-def unique_slugify(instance, queryset=None, value=None, max_length=255):
-    """function used to give a unique slug to an instance"""
+def _slug_strip(_value):
+    """removes the '-' separator from the end or start of the string"""
+    return re.sub(r'^%s+|%s+$' % ('-', '-'), '', _value)
+
+
+def _slug_candidates(slug, max_length):
+    """yields the slug followed by its numbered variants in the order they are tried"""
+
+    if slug:
+        yield slug
+
+    _next = 2
+    while True:
+        candidate = slug
+        end = '-%s' % _next
+        if len(candidate) + len(end) > max_length:
+            candidate = candidate[:max_length - len(end)]
+            candidate = _slug_strip(candidate)
+        yield '%s%s' % (candidate, end)
+        _next += 1
+
+
+def _slug_prefix(slug, max_length):
+    """returns a prefix shared by every candidate whose suffix is at most MAX_SLUG_SUFFIX_LENGTH long"""
+    return _slug_strip(slug[:max_length - MAX_SLUG_SUFFIX_LENGTH - 1]) or '-'
+
 
-    if not value:
-        value = generate_random_string(max_length)
+def allocate_unique_slugs(queryset, values, max_length=255, reserved=()):
+    """
+    gives each value a slug that is unique in queryset and within the batch,
+    the slugs taken by every candidate are fetched in one prefix query.
+    concurrent writers can still race for a slug, so callers saving into
+    a unique column should retry on IntegrityError.
+    """
 
-    slug = slugify(value, allow_unicode=True)
-    slug = slug[:max_length]  # limit its len to max_length of slug field
+    slugs = []
+    for value in values:
+        if not value:
+            value = generate_random_string(max_length)
 
-    def _slug_strip(_value):
-        """removes the '-' separator from the end or start of the string"""
-        return re.sub(r'^%s+|%s+$' % ('-', '-'), '', _value)
+        slug = slugify(value, allow_unicode=True)
+        slug = slug[:max_length]  # limit its len to max_length of slug field
+        slugs.append(_slug_strip(slug))
 
-    slug = _slug_strip(slug)
-    original_slug = slug
+    prefixes = {_slug_prefix(slug, max_length) for slug in slugs}
+    query = Q()
+    for slug in set(slugs):
+        query |= Q(slug=slug)
+    for prefix in prefixes:
+        query |= Q(slug__startswith=prefix, slug__regex=r'-[0-9]+$')
 
-    if not queryset:
+    taken = set(queryset.filter(query).values_list('slug', flat=True))
+    taken.update(reserved)
+
+    unique_slugs = []
+    for slug in slugs:
+        prefix = _slug_prefix(slug, max_length)
+        for candidate in _slug_candidates(slug, max_length):
+            if candidate in taken:
+                continue
+            if not candidate.startswith(prefix) and queryset.filter(slug=candidate).exists():
+                continue
+            break
+
+        taken.add(candidate)
+        unique_slugs.append(candidate)
+
+    return unique_slugs
+
+
+def unique_slugify(instance, queryset=None, value=None, max_length=255, reserved=()):
+    """function used to give a unique slug to an instance"""
+
+    if queryset is None:
         queryset = instance.__class__.objects.all()
 
     if instance.pk:
         queryset = queryset.exclude(pk=instance.pk)
 
-    _next = 2
-    while not slug or queryset.filter(slug=slug):
-        slug = original_slug
-        end = '-%s' % _next
-        if len(slug) + len(end) > max_length:
-            slug = slug[:max_length - len(end)]
-            slug = _slug_strip(slug)
-        slug = '%s%s' % (slug, end)
-        _next += 1
-
-    return slug
+    return allocate_unique_slugs(queryset, [value], max_length=max_length, reserved=reserved)[0]
@@ -1,9 +1,11 @@
 from django.contrib import admin
 
-from news.models import Source, Category, PostTag, Post, Comment
+from news.models import Source, Category, PostTag, Post, Comment, Stylesheet, SourceCategory
 
 admin.site.register(Source)
 admin.site.register(Category)
 admin.site.register(PostTag)
 admin.site.register(Post)
 admin.site.register(Comment)
+admin.site.register(Stylesheet)
+admin.site.register(SourceCategory)
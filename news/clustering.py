@@ -0,0 +1,112 @@
+import hashlib
+import random
+import re
+import struct
+
+from django.utils import timezone
+
+from news.models import Post, StoryBucket
+from news.search import normalize_arabic
+
+SIGNATURE_SIZE = 32
+BANDS = 16  # of SIGNATURE_SIZE / BANDS rows each, posts sharing a band are candidates
+SIMILARITY_THRESHOLD = 0.4  # the estimated jaccard similarity candidates need to be in the same story
+STORY_WINDOW = timezone.timedelta(days=2)  # how long a story takes in new posts
+DESCRIPTION_WORDS = 30
+
+MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(0)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(MERSENNE_PRIME)) for _ in range(SIGNATURE_SIZE)]
+
+STOP_WORDS = {
+    'the', 'and', 'for', 'with', 'from', 'that', 'this', 'are', 'was', 'were', 'has', 'have', 'had', 'its',
+    'after', 'over', 'into', 'about', 'will', 'new', 'not', 'but', 'his', 'her', 'their', 'they', 'who',
+    'في', 'من', 'على', 'الى', 'عن', 'مع', 'بعد', 'قبل', 'هذا', 'هذه', 'التي', 'الذي', 'او', 'ان', 'كان',
+    'خلال', 'حول', 'بين', 'عند', 'منذ', 'اليوم', 'لا', 'ما', 'قد', 'تم',
+}
+
+
+def get_story_words(post):
+    """the normalized words of the title and the start of the description, without stop words"""
+
+    text = post.title + ' ' + ' '.join(post.description.split()[:DESCRIPTION_WORDS])
+    words = re.findall(r'\w+', normalize_arabic(text.lower()))
+    return {word for word in words if len(word) > 1 and word not in STOP_WORDS and not word.isdigit()}
+
+
+def get_signature(words):
+    """the minhash signature of a set of words, SIGNATURE_SIZE 32 bit hashes"""
+
+    hashes = [int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), 'little') for word in words]
+    return tuple(min((a * value + b) % MERSENNE_PRIME for value in hashes) & 0xffffffff for a, b in PERMUTATIONS)
+
+
+def get_bucket_keys(signature):
+    """a 64 bit key for each band of the signature, signed to fit in a bigint column"""
+
+    rows = SIGNATURE_SIZE // BANDS
+    keys = []
+    for band in range(BANDS):
+        band_hash = hashlib.blake2b(struct.pack('<%dI' % (rows + 1), band, *signature[band * rows:(band + 1) * rows]),
+                                    digest_size=8)
+        keys.append(int.from_bytes(band_hash.digest(), 'little', signed=True))
+    return keys
+
+
+def get_similarity(signature, other_signature):
+    return sum(a == b for a, b in zip(signature, other_signature)) / SIGNATURE_SIZE
+
+
+def pack_signature(signature):
+    return struct.pack('<%dI' % SIGNATURE_SIZE, *signature)
+
+
+def unpack_signature(data):
+    return struct.unpack('<%dI' % SIGNATURE_SIZE, bytes(data))
+
+
+def cluster_posts(category, posts):
+    """
+    assigns each of the saved posts to the story of the most similar post of the category
+    from the past STORY_WINDOW, earlier posts of the page included, when it's similar enough.
+    posts that start a story get their own id as its id. candidates are looked up in the lsh
+    buckets of the posts, so it runs in 3 queries whatever the number of posts in the category.
+    """
+
+    signatures = {}
+    buckets = {}  # key -> [(post id, story cluster, signature)]
+    for post in posts:
+        words = get_story_words(post)
+        if words:
+            signatures[post.pk] = get_signature(words)
+
+    keys = {post.pk: get_bucket_keys(signatures[post.pk]) for post in posts if post.pk in signatures}
+    candidates = StoryBucket.objects.filter(category=category, key__in={key for post_keys in keys.values()
+                                                                        for key in post_keys},
+                                            created_at__gte=timezone.now() - STORY_WINDOW) \
+        .values_list('key', 'post_id', 'post__story_cluster', 'post__story_signature')
+    for key, post_id, story_cluster, signature in candidates:
+        buckets.setdefault(key, []).append((post_id, story_cluster, unpack_signature(signature)))
+
+    new_buckets = []
+    for post in posts:
+        post.story_cluster, post.is_story_duplicate = post.pk, False
+        if post.pk not in signatures:
+            continue
+
+        signature = signatures[post.pk]
+        best_similarity = SIMILARITY_THRESHOLD
+        for key in keys[post.pk]:
+            for post_id, story_cluster, other_signature in buckets.get(key, ()):
+                similarity = get_similarity(signature, other_signature)
+                if similarity >= best_similarity:
+                    best_similarity = similarity
+                    post.story_cluster, post.is_story_duplicate = story_cluster or post_id, True
+
+        post.story_signature = pack_signature(signature)
+        for key in keys[post.pk]:
+            buckets.setdefault(key, []).append((post.pk, post.story_cluster, signature))
+            new_buckets.append(StoryBucket(key=key, post=post, category=category))
+
+    Post.objects.bulk_update(posts, ('story_cluster', 'is_story_duplicate', 'story_signature'))
+    StoryBucket.objects.bulk_create(new_buckets)
@@ -0,0 +1,69 @@
+import json
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from news.models import Post
+
+EXPORTED_FIELDS = (
+    ('slug', 'slug'),
+    ('source', 'source__slug'),
+    ('category', 'category__slug'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('detail_url', 'detail_url'),
+    ('thumbnail', 'thumbnail'),
+    ('full_image', 'full_image'),
+    ('timestamp', 'timestamp'),
+    ('comments_count', 'comments_count'),
+)
+
+
+def parse_since(since):
+    """parses an iso 8601 timestamp, naive ones are taken as utc, raises ValueError on invalid ones"""
+
+    timestamp = parse_datetime(since)
+    if not timestamp:
+        raise ValueError('Invalid timestamp %s' % since)
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp, timezone.utc)
+    return timestamp
+
+
+def get_exported_posts(since=None, source=None, category=None):
+    """the posts newer than since, of the source and category slugs if given, oldest first"""
+
+    posts = Post.objects.order_by('timestamp', 'pk')
+    if since:
+        posts = posts.filter(timestamp__gt=since)
+    if source:
+        posts = posts.filter(source__slug=source)
+    if category:
+        posts = posts.filter(category__slug=category)
+
+    return posts.values_list(*(field for name, field in EXPORTED_FIELDS))
+
+
+def export_posts(posts, chunk_size=2000):
+    """
+    yields the posts as ndjson, a chunk of lines at a time, reading them chunk_size rows at a time
+    from a server side cursor where the database has them, so memory use doesn't grow with the posts.
+    """
+
+    names = [name for name, field in EXPORTED_FIELDS]
+    timestamp_field = serializers.DateTimeField()
+
+    lines = []
+    for values in posts.iterator(chunk_size=chunk_size):
+        post = dict(zip(names, values))
+        if post['timestamp']:
+            post['timestamp'] = timestamp_field.to_representation(post['timestamp'])
+        lines.append(json.dumps(post, ensure_ascii=False) + '\n')
+
+        if len(lines) == chunk_size:
+            yield ''.join(lines)
+            lines = []
+
+    if lines:
+        yield ''.join(lines)
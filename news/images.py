@@ -0,0 +1,210 @@
+import fcntl
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+
+import requests
+from django.conf import settings
+from django.urls import reverse
+from PIL import Image
+
+from news.models import ProxiedImage
+
+IMAGE_SIZES = {'small': 240, 'medium': 480, 'large': 1080}  # the longest side of each variant
+IMAGE_FORMATS = {'webp': ('WEBP', 'image/webp'), 'jpeg': ('JPEG', 'image/jpeg')}
+IMAGE_QUALITY = 80
+
+FETCH_TIMEOUT = 10
+MAX_ORIGINAL_SIZE = 10 * 1024 * 1024
+LOCK_STRIPES = 256
+
+session = requests.session()
+
+
+class ImageUnavailable(Exception):
+    pass
+
+
+class ImageCache:
+    """
+    a directory of files kept under max_size bytes by deleting the least recently used ones,
+    files are touched when they're read so their mtime is when they were last used.
+    the size is counted once per process and then kept up to date with its own writes,
+    the directory is only scanned again when that count goes over max_size.
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        self.size = None
+        self.size_lock = threading.Lock()
+
+        os.makedirs(os.path.join(directory, 'locks'), exist_ok=True)
+
+    def get_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, name):
+        path = self.get_path(name)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:  # evicted since it was read
+            pass
+        return data
+
+    def set(self, name, data):
+        # written to a temporary file first, so readers never see a partial file
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temporary_path, self.get_path(name))
+
+        with self.size_lock:
+            if self.size is None:
+                self.size = self.get_files_size()
+            else:
+                self.size += len(data)
+
+            if self.size > self.max_size:
+                self.evict()
+
+    def get_files(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # evicted by another process
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def get_files_size(self):
+        return sum(size for mtime, size, path in self.get_files())
+
+    def evict(self):
+        """deletes the least recently used files until the cache is back to 90% of max_size"""
+
+        files = sorted(self.get_files())
+        self.size = sum(size for mtime, size, path in files)
+        for mtime, size, path in files:
+            if self.size <= self.max_size * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+
+    @contextmanager
+    def lock(self, key):
+        """
+        an exclusive lock on key across threads and processes, locks are striped over
+        LOCK_STRIPES files so they don't pile up, unrelated keys rarely share one.
+        """
+
+        path = os.path.join(self.directory, 'locks', '%02x.lock' % (int(key[:8], 16) % LOCK_STRIPES))
+        with open(path, 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+
+_image_caches = {}
+
+
+def get_image_cache():
+    key = (settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_MAX_SIZE)
+    if key not in _image_caches:
+        _image_caches[key] = ImageCache(*key)
+    return _image_caches[key]
+
+
+def get_variant_name(image_hash, size, image_format):
+    return '%s-%s.%s' % (image_hash, size, image_format)
+
+
+def fetch_original(url):
+    try:
+        with session.get(url, timeout=FETCH_TIMEOUT, stream=True) as response:
+            if response.status_code != 200:
+                raise ImageUnavailable('%s returned %d' % (url, response.status_code))
+
+            data = BytesIO()
+            for chunk in response.iter_content(64 * 1024):
+                data.write(chunk)
+                if data.tell() > MAX_ORIGINAL_SIZE:
+                    raise ImageUnavailable('%s is too large' % url)
+            return data.getvalue()
+    except requests.RequestException as error:
+        raise ImageUnavailable(error)
+
+
+def resize_image(data, size, image_format):
+    """the image scaled down to fit in a size x size box, encoded in image_format"""
+
+    pillow_format, content_type = IMAGE_FORMATS[image_format]
+    try:
+        image = Image.open(BytesIO(data))
+        image.draft('RGB', (size, size))  # jpegs are decoded at the smallest scale that's still large enough
+        image.thumbnail((size, size), Image.LANCZOS)
+
+        if pillow_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+
+        output = BytesIO()
+        image.save(output, pillow_format, quality=IMAGE_QUALITY)
+        return output.getvalue()
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        raise ImageUnavailable(error)
+
+
+def get_image(image_hash, url, size, image_format):
+    """
+    the variant of the image, made from the original the first time it's asked for.
+    requests for the same image wait on its lock for the first one to make it, so its
+    original is only fetched once, and is then kept in the cache for its other variants.
+    """
+
+    cache = get_image_cache()
+    name = get_variant_name(image_hash, size, image_format)
+
+    with cache.lock(image_hash):
+        data = cache.get(name)
+        if data is not None:  # made while this request waited on the lock
+            return data
+
+        original = cache.get(image_hash + '.original')
+        if original is None:
+            original = fetch_original(url)
+            cache.set(image_hash + '.original', original)
+
+        data = resize_image(original, IMAGE_SIZES[size], image_format)
+        cache.set(name, data)
+        return data
+
+
+def register_images(posts):
+    """saves the images of the posts so the images endpoint can serve them"""
+
+    urls = {url for post in posts for url in (post.thumbnail, post.full_image) if url}
+    if urls:
+        ProxiedImage.objects.bulk_create([ProxiedImage(hash=ProxiedImage.get_hash(url), url=url) for url in urls],
+                                         ignore_conflicts=True)
+
+
+def get_proxied_url(request, url, size):
+    path = reverse('image', kwargs={'image_hash': ProxiedImage.get_hash(url), 'size': size})
+    return request.build_absolute_uri(path) if request else path
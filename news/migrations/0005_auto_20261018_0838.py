@@ -0,0 +1,46 @@
+# Generated by Django 3.1 on 2026-10-18 08:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_auto_20200827_0036'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stylesheet',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(max_length=64, unique=True)),
+                ('content', models.TextField()),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ('-timestamp',)},
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='detail_url',
+            field=models.URLField(max_length=2048),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='full_image',
+            field=models.URLField(max_length=2048, null=True),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='thumbnail',
+            field=models.URLField(max_length=2048, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='stylesheet',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='posts', to='news.stylesheet'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+import hashlib
+import re
+
+from django.db import migrations
+
+META_TAG = '<meta name="viewport" content="width=device-width, initial-scale=1.0, user-scalable=no">'
+
+REQUIRED_STYLE = '<style>:not(head) {background-color: white;} ' \
+                 'img, video, iframe {display: block; margin: auto; max-width: 100%; ' \
+                 'object-fit: scale-down;} </style>'
+
+FULL_BODY_PATTERN = re.compile('^<!DOCTYPE html><html>' + re.escape(META_TAG) + '<head>(.*?)' +
+                               re.escape(REQUIRED_STYLE) + '</head><body dir="auto">(.*)</body></html>$',
+                               re.DOTALL)
+
+STYLE_TAG_PATTERN = re.compile(r'<style\b.*?</style>|<link\b[^>]*>', re.DOTALL | re.IGNORECASE)
+STYLESHEET_LINK_PATTERN = re.compile(r'\brel="[^"]*\bstylesheet\b', re.IGNORECASE)
+
+BATCH_SIZE = 500
+
+
+def get_stylesheets(styles):
+    """the <style> and stylesheet <link> tags of a page's head, other links differ for every article"""
+
+    return ''.join(tag for tag in STYLE_TAG_PATTERN.findall(styles)
+                   if tag[:6].lower() == '<style' or STYLESHEET_LINK_PATTERN.search(tag))
+
+
+def _batches(queryset):
+    batch = []
+    for post in queryset.iterator(chunk_size=BATCH_SIZE):
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def move_styles_to_stylesheets(apps, schema_editor):
+    Post = apps.get_model('news', 'Post')
+    Stylesheet = apps.get_model('news', 'Stylesheet')
+
+    posts = Post.objects.filter(body__startswith='<!DOCTYPE html>').only('pk', 'body')
+    for batch in _batches(posts):
+        styles = {}
+        updated_posts = []
+        for post in batch:
+            match = FULL_BODY_PATTERN.match(post.body)
+            if not match:
+                continue
+
+            post_styles, post.body = match.groups()
+            post_styles = get_stylesheets(post_styles)
+            post.stylesheet_hash = hashlib.sha256(post_styles.encode()).hexdigest() if post_styles else None
+            if post_styles:
+                styles[post.stylesheet_hash] = post_styles
+            updated_posts.append(post)
+
+        Stylesheet.objects.bulk_create([Stylesheet(hash=stylesheet_hash, content=content)
+                                        for stylesheet_hash, content in styles.items()],
+                                       ignore_conflicts=True)
+        stylesheets_ids = dict(Stylesheet.objects.filter(hash__in=styles.keys()).values_list('hash', 'pk'))
+
+        for post in updated_posts:
+            post.stylesheet_id = stylesheets_ids.get(post.stylesheet_hash)
+
+        Post.objects.bulk_update(updated_posts, ['body', 'stylesheet'])
+
+
+def inline_stylesheets(apps, schema_editor):
+    Post = apps.get_model('news', 'Post')
+
+    posts = Post.objects.exclude(body='').exclude(body__startswith='<!DOCTYPE html>') \
+        .select_related('stylesheet').only('pk', 'body', 'stylesheet__content')
+    for batch in _batches(posts):
+        for post in batch:
+            styles = post.stylesheet.content if post.stylesheet else ''
+            post.body = '<!DOCTYPE html><html>' + META_TAG + '<head>' + styles + REQUIRED_STYLE + \
+                        '</head><body dir="auto">' + post.body + '</body></html>'
+            post.stylesheet = None
+
+        Post.objects.bulk_update(batch, ['body', 'stylesheet'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_auto_20261018_0838'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_styles_to_stylesheets, inline_stylesheets),
+    ]
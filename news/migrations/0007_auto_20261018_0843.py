@@ -0,0 +1,35 @@
+# Generated by Django 3.1 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_move_post_styles_to_stylesheets'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='slug',
+            field=models.SlugField(max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='source',
+            name='slug',
+            field=models.SlugField(max_length=255, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category', '-timestamp'], name='news_post_categor_f92a80_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['source', 'category', '-timestamp'], name='news_post_source__89a5af_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['source', 'category', 'detail_url'], name='news_post_source__858e6b_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_post_comments(apps, schema_editor):
+    Post = apps.get_model('news', 'Post')
+    Comment = apps.get_model('news', 'Comment')
+
+    comments_count = Comment.objects.filter(post=OuterRef('pk')).order_by().values('post') \
+        .annotate(count=Count('pk')).values('count')
+    Post.objects.update(comments_count=Coalesce(Subquery(comments_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_post_comments_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_post_comments, migrations.RunPython.noop),
+    ]
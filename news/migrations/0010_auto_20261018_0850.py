@@ -0,0 +1,33 @@
+# Generated by Django 3.1 on 2026-10-18 08:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0009_count_post_comments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourceCategory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('latest_timestamp', models.DateTimeField(null=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='source_categories', to='news.category')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='source_categories', to='news.source')),
+            ],
+            options={
+                'verbose_name_plural': 'Source categories',
+                'unique_together': {('source', 'category')},
+            },
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='categories',
+            field=models.ManyToManyField(related_name='sources', through='news.SourceCategory', to='news.Category'),
+        ),
+    ]
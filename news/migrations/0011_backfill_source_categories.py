@@ -0,0 +1,26 @@
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def backfill_source_categories(apps, schema_editor):
+    Post = apps.get_model('news', 'Post')
+    SourceCategory = apps.get_model('news', 'SourceCategory')
+
+    pairs = Post.objects.order_by().values('source', 'category') \
+        .annotate(posts_count=Count('pk'), latest_timestamp=Max('timestamp'))
+    SourceCategory.objects.bulk_create([
+        SourceCategory(source_id=pair['source'], category_id=pair['category'],
+                       posts_count=pair['posts_count'], latest_timestamp=pair['latest_timestamp'])
+        for pair in pairs
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0010_auto_20261018_0850'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_source_categories, migrations.RunPython.noop),
+    ]
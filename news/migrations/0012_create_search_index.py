@@ -0,0 +1,47 @@
+# Generated by Django 3.1 on 2026-10-18 08:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+POSTGRES_CREATE_INDEX = (
+    'CREATE TABLE news_post_search (post_id integer PRIMARY KEY, document tsvector NOT NULL)',
+    'CREATE INDEX news_post_search_document ON news_post_search USING gin (document)',
+)
+
+# the post id is also the table's rowid, post_id is there for the orm's joins
+SQLITE_CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE news_post_search USING fts5(post_id UNINDEXED, title, description, body, "
+    "tokenize = 'porter unicode61 remove_diacritics 2')",
+)
+
+
+def create_search_index(apps, schema_editor):
+    statements = {'postgresql': POSTGRES_CREATE_INDEX, 'sqlite': SQLITE_CREATE_INDEX}
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute('DROP TABLE news_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0011_backfill_source_categories'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchDocument',
+            fields=[
+                ('post', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='news.post')),
+            ],
+            options={
+                'db_table': 'news_post_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
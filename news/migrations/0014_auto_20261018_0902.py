@@ -0,0 +1,44 @@
+# Generated by Django 3.1 on 2026-10-18 09:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0013_auto_20261018_0900'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='is_story_duplicate',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='story_cluster',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='story_signature',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.CreateModel(
+            name='StoryBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='news.category')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='news.post')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='storybucket',
+            index=models.Index(fields=['category', 'key', 'created_at'], name='news_storyb_categor_aa9bee_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+from django.db.models import F
+
+
+def set_story_clusters(apps, schema_editor):
+    Post = apps.get_model('news', 'Post')
+    Post.objects.update(story_cluster=F('pk'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0014_auto_20261018_0902'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_story_clusters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.1 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0015_set_story_clusters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProxiedImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(max_length=64, unique=True)),
+                ('url', models.URLField(max_length=2048)),
+            ],
+        ),
+    ]
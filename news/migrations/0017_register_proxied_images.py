@@ -0,0 +1,31 @@
+import hashlib
+
+from django.db import migrations
+
+
+def register_proxied_images(apps, schema_editor):
+    Post = apps.get_model('news', 'Post')
+    ProxiedImage = apps.get_model('news', 'ProxiedImage')
+
+    def save(urls):
+        ProxiedImage.objects.bulk_create([ProxiedImage(hash=hashlib.sha256(url.encode()).hexdigest(), url=url)
+                                          for url in urls], ignore_conflicts=True)
+
+    urls = set()
+    for thumbnail, full_image in Post.objects.order_by().values_list('thumbnail', 'full_image').iterator(5000):
+        urls.update(url for url in (thumbnail, full_image) if url)
+        if len(urls) >= 5000:
+            save(urls)
+            urls = set()
+    save(urls)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0016_proxiedimage'),
+    ]
+
+    operations = [
+        migrations.RunPython(register_proxied_images, migrations.RunPython.noop),
+    ]
@@ -1,25 +1,24 @@
+import hashlib
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 
 from core.utils import unique_slugify
 
 
 class Source(models.Model):
     sort = models.SmallAutoField(primary_key=True)
-    slug = models.SlugField(max_length=255)
+    slug = models.SlugField(max_length=255, unique=True)
     title = models.CharField(max_length=100)
     image = models.ImageField(null=True)
     description = models.TextField()
     website = models.URLField(blank=True)
+    categories = models.ManyToManyField('Category', through='SourceCategory', related_name='sources')
 
     class Meta:
         ordering = ('sort',)
 
-    @property
-    def categories(self):
-        return Category.objects.filter(pk__in=self.posts.values_list('category', flat=True)
-                                       .distinct())
-
     def save(self, **kwargs):
         self.slug = unique_slugify(self, value=self.title)
 
@@ -32,7 +31,7 @@ class Source(models.Model):
 class Category(models.Model):
     sort = models.SmallAutoField(primary_key=True)
     image = models.ImageField()
-    slug = models.SlugField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
     title = models.CharField(max_length=100)
 
     class Meta:
@@ -51,6 +50,22 @@ class Category(models.Model):
         return self.title
 
 
+class SourceCategory(models.Model):
+    """the categories a source has posts in, kept up to date by the scraper's ingest"""
+
+    source = models.ForeignKey(Source, on_delete=models.CASCADE, related_name='source_categories')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='source_categories')
+    posts_count = models.PositiveIntegerField(default=0)
+    latest_timestamp = models.DateTimeField(null=True)
+
+    class Meta:
+        verbose_name_plural = 'Source categories'
+        unique_together = ('source', 'category',)
+
+    def __str__(self):
+        return '%s - %s' % (self.source, self.category)
+
+
 class PostTag(models.Model):
     tag = models.CharField(max_length=255, unique=True)
 
@@ -58,6 +73,27 @@ class PostTag(models.Model):
         return self.tag
 
 
+class Stylesheet(models.Model):
+    """the <link> and <style> tags of a source's article pages, stored once and shared by their posts"""
+
+    hash = models.CharField(max_length=64, unique=True)
+    content = models.TextField()
+
+    @staticmethod
+    def get_hash(content):
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def __str__(self):
+        return self.hash
+
+
+POST_BODY_META_TAG = '<meta name="viewport" content="width=device-width, initial-scale=1.0, user-scalable=no">'
+
+POST_BODY_REQUIRED_STYLE = '<style>:not(head) {background-color: white;} ' \
+                           'img, video, iframe {display: block; margin: auto; max-width: 100%; ' \
+                           'object-fit: scale-down;} </style>'
+
+
 class Post(models.Model):
     slug = models.SlugField(allow_unicode=True, db_index=True, unique=True, max_length=1024)
     source = models.ForeignKey(Source, on_delete=models.CASCADE, related_name='posts')
@@ -68,11 +104,24 @@ class Post(models.Model):
     thumbnail = models.URLField(null=True, max_length=2048)
     full_image = models.URLField(null=True, max_length=2048)
     detail_url = models.URLField(max_length=2048)
-    body = models.TextField()
+    body = models.TextField()  # the article's html, its page styles are in stylesheet
+    stylesheet = models.ForeignKey(Stylesheet, null=True, on_delete=models.SET_NULL, related_name='posts')
     timestamp = models.DateTimeField(null=True)
+    comments_count = models.PositiveIntegerField(default=0)  # kept up to date by the comments signals
+    updated_at = models.DateTimeField(auto_now=True)
+    # the id of the story's first post, set at ingest with the minhash signature of its title and description
+    story_cluster = models.PositiveIntegerField(null=True)
+    is_story_duplicate = models.BooleanField(default=False)
+    story_signature = models.BinaryField(null=True, editable=False)
 
     class Meta:
         ordering = ('-timestamp',)
+        indexes = (
+            models.Index(fields=('category', '-timestamp')),  # category feeds
+            models.Index(fields=('source', 'category', '-timestamp')),  # source category feeds
+            models.Index(fields=('source', 'category', 'detail_url')),  # the scraper's known urls check
+            models.Index(fields=('updated_at', 'id')),  # the sync endpoint's changes
+        )
 
     def save(self, **kwargs):
         self.slug = unique_slugify(self, value=self.title)
@@ -83,8 +132,72 @@ class Post(models.Model):
         return self.title
 
     @property
-    def comments_count(self):
-        return self.comments.count()
+    def full_body(self):
+        """the html document shown to users, assembled from the body and its stylesheet"""
+
+        if not self.body or self.body.startswith('<!DOCTYPE html>'):
+            return self.body
+
+        styles = self.stylesheet.content if self.stylesheet_id else ''
+
+        return '<!DOCTYPE html><html>' + POST_BODY_META_TAG + '<head>' + styles + POST_BODY_REQUIRED_STYLE \
+               + '</head>' + '<body dir=\"auto\">' + self.body + '</body></html>'
+
+
+class PostTombstone(models.Model):
+    """a deleted post, kept for the sync endpoint to tell clients about it"""
+
+    slug = models.SlugField(allow_unicode=True, max_length=1024)
+    # kept after the category is deleted, so clients syncing it still get its posts' tombstones
+    category = models.ForeignKey(Category, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('deleted_at', 'id')),
+        )
+
+    def __str__(self):
+        return self.slug
+
+
+class ProxiedImage(models.Model):
+    """a publisher's image url, served resized by the images endpoint under the hash of the url"""
+
+    hash = models.CharField(max_length=64, unique=True)
+    url = models.URLField(max_length=2048)
+
+    @staticmethod
+    def get_hash(url):
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def __str__(self):
+        return self.url
+
+
+class StoryBucket(models.Model):
+    """an lsh bucket of a post's story signature band, where similar posts are looked up"""
+
+    key = models.BigIntegerField()
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('category', 'key', 'created_at')),
+        )
+
+
+class PostSearchDocument(models.Model):
+    """a post's row in the search index, its table is created by a migration for each database"""
+
+    post = models.OneToOneField(Post, primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False,
+                                related_name='search_document')
+
+    class Meta:
+        managed = False
+        db_table = 'news_post_search'
 
 
 class Comment(models.Model):
@@ -99,7 +212,8 @@ class Comment(models.Model):
         unique_together = ('slug', 'post',)
 
     def save(self, **kwargs):
-        self.slug = unique_slugify(self, self.post.comments.all(), max_length=15)
+        if not self.slug:
+            self.slug = unique_slugify(self, Comment.objects.filter(post_id=self.post_id), max_length=15)
 
         return super().save(**kwargs)
 
@@ -4,8 +4,20 @@ from core.pagination import CursorPaginationWithCount
 class TimeStampCursorPagination(CursorPaginationWithCount):
     ordering = '-timestamp'
     page_size = 20
+    count_strategy = 'cached'
 
 
 class SortCursorPagination(CursorPaginationWithCount):
     ordering = 'sort'
     page_size = 30
+
+
+class CommentsCursorPagination(CursorPaginationWithCount):
+    ordering = '-timestamp'
+    page_size = 20
+
+
+class RankCursorPagination(CursorPaginationWithCount):
+    ordering = ('-rank', '-timestamp')
+    page_size = 20
+    count_strategy = 'first_page'
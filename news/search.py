@@ -0,0 +1,146 @@
+import re
+
+import lxml.html
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'news_post_search'
+
+ARABIC_CHARACTERS = re.compile('[\u0600-\u06ff]')
+ARABIC_DIACRITICS = re.compile('[\u064b-\u065f\u0670\u0640]')  # harakat, superscript alef and tatweel
+ARABIC_LETTERS = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي', 'ة': 'ه'})
+ARABIC_PREFIXES = re.compile(r'\b(?:وال|بال|كال|فال|لل|ال)(?=\w\w)')
+
+
+def normalize_arabic(text):
+    """folds the arabic letter variants and diacritics, and strips the definite article prefixes"""
+
+    text = ARABIC_DIACRITICS.sub('', text).translate(ARABIC_LETTERS)
+    return ARABIC_PREFIXES.sub('', text)
+
+
+def get_language(text):
+    return 'arabic' if ARABIC_CHARACTERS.search(text) else 'english'
+
+
+def get_body_text(body):
+    if not body or not body.strip():
+        return ''
+    return lxml.html.fromstring(body).text_content()
+
+
+def get_search_fields(post):
+    """the language of a post and its title, description and body text, arabic ones normalized"""
+
+    fields = [post.title, post.description, get_body_text(post.body)]
+    language = get_language(post.title + post.description)
+    if language == 'arabic':
+        fields = [normalize_arabic(field) for field in fields]
+
+    return language, fields
+
+
+class SqliteSearchBackend:
+    """an fts5 table with the porter stemmer, english words are stemmed and arabic ones only normalized"""
+
+    rank_weights = (0.0, 10.0, 4.0, 1.0)  # post id, title, description and body
+
+    def index_posts(self, cursor, posts):
+        cursor.executemany('INSERT OR REPLACE INTO %s (rowid, post_id, title, description, body) '
+                           'VALUES (%%s, %%s, %%s, %%s, %%s)' % SEARCH_TABLE,
+                           [[post.pk, post.pk] + get_search_fields(post)[1] for post in posts])
+
+    def unindex_posts(self, cursor, posts_ids):
+        cursor.executemany('DELETE FROM %s WHERE rowid = %%s' % SEARCH_TABLE, [[pk] for pk in posts_ids])
+
+    def get_match_query(self, query):
+        """the words of the query quoted as fts5 strings, so they're all required and can't inject operators"""
+
+        words = re.findall(r'\w+', normalize_arabic(query))
+        return ' '.join('"%s"' % word for word in words)
+
+    def search(self, queryset, query):
+        match_query = self.get_match_query(query)
+        if not match_query:
+            return None
+
+        matches = RawSQL('%s MATCH %%s' % SEARCH_TABLE, (match_query,), output_field=BooleanField())
+        rank = RawSQL('-bm25(%s, %s)' % (SEARCH_TABLE, ', '.join(str(weight) for weight in self.rank_weights)),
+                      (), output_field=FloatField())
+
+        return queryset.filter(search_document__isnull=False).filter(matches).annotate(rank=rank)
+
+
+class PostgresSearchBackend:
+    """
+    a table of weighted tsvectors with a gin index, english posts use the english configuration
+    and arabic ones the simple one, as they're already normalized.
+    """
+
+    document = "setweight(to_tsvector(%s::regconfig, %s), 'A') || setweight(to_tsvector(%s::regconfig, %s), 'B') " \
+               "|| setweight(to_tsvector(%s::regconfig, %s), 'C')"
+    ts_query = "(websearch_to_tsquery('english', %s) || websearch_to_tsquery('simple', %s))"
+
+    def index_posts(self, cursor, posts):
+        rows = []
+        for post in posts:
+            language, fields = get_search_fields(post)
+            config = 'english' if language == 'english' else 'simple'
+            rows.append([post.pk, config, fields[0], config, fields[1], config, fields[2]])
+
+        cursor.executemany('INSERT INTO %s (post_id, document) VALUES (%%s, %s) '
+                           'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document'
+                           % (SEARCH_TABLE, self.document), rows)
+
+    def unindex_posts(self, cursor, posts_ids):
+        cursor.execute('DELETE FROM %s WHERE post_id = ANY(%%s)' % SEARCH_TABLE, [list(posts_ids)])
+
+    def search(self, queryset, query):
+        query = normalize_arabic(query).strip()
+        if not query:
+            return None
+
+        matches = RawSQL('%s.document @@ %s' % (SEARCH_TABLE, self.ts_query), (query, query),
+                         output_field=BooleanField())
+        rank = RawSQL('ts_rank(%s.document, %s)' % (SEARCH_TABLE, self.ts_query), (query, query),
+                      output_field=FloatField())
+
+        return queryset.filter(search_document__isnull=False).filter(matches).annotate(rank=rank)
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite':
+        return SqliteSearchBackend()
+    return None
+
+
+def index_posts(posts):
+    backend = get_search_backend()
+    if backend and posts:
+        with connection.cursor() as cursor:
+            backend.index_posts(cursor, posts)
+
+
+def unindex_posts(posts_ids):
+    backend = get_search_backend()
+    if backend and posts_ids:
+        with connection.cursor() as cursor:
+            backend.unindex_posts(cursor, posts_ids)
+
+
+def search_posts(queryset, query):
+    """the posts matching query annotated with their rank, higher ranks matching better"""
+
+    backend = get_search_backend()
+    results = None
+    if backend:
+        results = backend.search(queryset, query)
+    elif query.strip():  # databases without a search index only match titles
+        results = queryset.filter(title__icontains=query.strip()).annotate(rank=Value(0.0, FloatField()))
+
+    if results is None:
+        return queryset.none().annotate(rank=Value(0.0, FloatField()))
+    return results
@@ -1,5 +1,8 @@
+from django.conf import settings
+from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 
+from news.images import get_proxied_url
 from news.models import Post, Source, Comment, Category
 from users.serializers import UserProfileSerializer
 
@@ -12,10 +15,18 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
 
     def get_is_favourited_by_user(self, category):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            return category.is_favourited_by_user(user)
-        return False
+        return category.pk in self.get_favourite_categories_ids()
+
+    def get_favourite_categories_ids(self):
+        # loaded once per request, the context is shared by every category serialized in it
+        if 'favourite_categories_ids' not in self.context:
+            user = self.context.get('request').user
+            favourite_categories_ids = set()
+            if user.is_authenticated:
+                favourite_categories_ids = set(user.favourite_categories.values_list('pk', flat=True))
+            self.context['favourite_categories_ids'] = favourite_categories_ids
+
+        return self.context['favourite_categories_ids']
 
 
 class SourceSerializer(serializers.ModelSerializer):
@@ -32,13 +43,29 @@ class SourceDetailSerializer(serializers.ModelSerializer):
         model = Source
 
 
+class ProxiedImageField(serializers.URLField):
+    """the url of the image resized by the images endpoint when PROXY_POST_IMAGES is set, or its own url"""
+
+    def __init__(self, size, **kwargs):
+        self.size = size
+        kwargs.setdefault('read_only', True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value or not settings.PROXY_POST_IMAGES:
+            return value
+        return get_proxied_url(self.context.get('request'), value, self.size)
+
+
 class PostSerializer(serializers.ModelSerializer):
     source = SourceSerializer()
     category = CategorySerializer()
+    thumbnail = ProxiedImageField('small')
+    full_image = ProxiedImageField('large')
 
     class Meta:
         fields = ('slug', 'source', 'category', 'title', 'description',
-                  'thumbnail', 'full_image', 'timestamp')
+                  'thumbnail', 'full_image', 'timestamp', 'story_cluster')
         model = Post
 
 
@@ -46,7 +73,10 @@ class PostDetailSerializer(serializers.ModelSerializer):
     source = SourceSerializer()
     category = CategorySerializer()
     tags = serializers.StringRelatedField(many=True)
+    body = serializers.CharField(source='full_body', read_only=True)
     comments_count = serializers.IntegerField(read_only=True)
+    thumbnail = ProxiedImageField('small')
+    full_image = ProxiedImageField('large')
 
     class Meta:
         fields = ('slug', 'source', 'category', 'title', 'detail_url', 'body', 'description',
@@ -67,7 +97,7 @@ class CommentSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        post = Post.objects.get(slug=self.context['view'].kwargs.get('post'))
+        post = get_object_or_404(Post.objects.only('slug'), slug=self.context['view'].kwargs.get('post'))
         user = self.context['request'].user
 
         return Comment.objects.create(post=post, user=user, **validated_data)
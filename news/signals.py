@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.cache import CATEGORIES_SCOPE, SOURCES_SCOPE, bump_versions, get_post_scope, get_posts_scopes
+from news.models import Category, Source, Post, Comment, PostTombstone
+from news.search import index_posts, unindex_posts
+
+# versions are bumped once the change is committed, otherwise a request in between
+# could cache the old rows under the new versions
+@receiver((post_save, post_delete), sender=Category)
+def bump_categories_version(**kwargs):
+    transaction.on_commit(lambda: bump_versions(CATEGORIES_SCOPE))
+
+
+@receiver((post_save, post_delete), sender=Source)
+def bump_sources_version(**kwargs):
+    transaction.on_commit(lambda: bump_versions(SOURCES_SCOPE))
+
+
+@receiver((post_save, post_delete), sender=Post)
+def bump_post_versions(instance, **kwargs):
+    # ingest bulk creates posts and bumps these itself, this catches deletions and admin edits
+    scopes = (get_post_scope(instance.slug),) + get_posts_scopes(instance.source, instance.category)
+    transaction.on_commit(lambda: bump_versions(*scopes))
+
+
+@receiver(post_save, sender=Post)
+def index_post(instance, **kwargs):
+    # ingest indexes the posts it bulk creates, this catches admin edits
+    transaction.on_commit(lambda: index_posts([instance]))
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(instance, **kwargs):
+    # the search table has no foreign key to cascade from
+    unindex_posts([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(comments_count=F('comments_count') + 1)
+        scope = get_post_scope(instance.post.slug)
+        transaction.on_commit(lambda: bump_versions(scope))
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id).update(comments_count=F('comments_count') - 1)
+    scope = get_post_scope(instance.post.slug)
+    transaction.on_commit(lambda: bump_versions(scope))
+
+
+@receiver(post_delete, sender=Post)
+def create_post_tombstone(instance, **kwargs):
+    PostTombstone.objects.create(slug=instance.slug, category_id=instance.category_id)
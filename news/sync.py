@@ -0,0 +1,119 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from news.models import PostTombstone
+
+# changes are only synced once they're this old, as rows saved by transactions that
+# are yet to commit can have older updated_at values than rows that are already visible
+SYNC_SETTLE_DELAY = timezone.timedelta(seconds=5)
+TOMBSTONES_RETENTION = timezone.timedelta(days=30)
+
+
+class InvalidSyncToken(Exception):
+    pass
+
+
+class ExpiredSyncToken(Exception):
+    pass
+
+
+class SyncPosition:
+    """
+    where a client is in the changes, the (updated_at, pk) of the last post it got,
+    the (deleted_at, pk) of the last tombstone and the categories it syncs.
+    a None pk stands for all the rows at that time, a None time for none of them.
+    """
+
+    def __init__(self, post_position, tombstone_position, categories_hash):
+        self.post_position = post_position
+        self.tombstone_position = tombstone_position
+        self.categories_hash = categories_hash
+
+    @classmethod
+    def start(cls, until, categories_hash):
+        """a position at the start of the posts, past the tombstones as the client has no posts to delete"""
+        return cls((None, None), (until, None), categories_hash)
+
+    @classmethod
+    def from_token(cls, token):
+        try:
+            (post_time, post_pk), (tombstone_time, tombstone_pk), categories_hash = \
+                json.loads(base64.urlsafe_b64decode(token.encode()))
+            post_time = parse_datetime(post_time) if post_time else None
+            tombstone_time = parse_datetime(tombstone_time)
+            if not tombstone_time or not isinstance(categories_hash, str):
+                raise ValueError
+            return cls((post_time, int(post_pk) if post_pk is not None else None),
+                       (tombstone_time, int(tombstone_pk) if tombstone_pk is not None else None), categories_hash)
+        except (binascii.Error, UnicodeError, TypeError, ValueError):
+            raise InvalidSyncToken
+
+    def to_token(self):
+        post_time, post_pk = self.post_position
+        tombstone_time, tombstone_pk = self.tombstone_position
+        position = [[post_time.isoformat() if post_time else None, post_pk],
+                    [tombstone_time.isoformat(), tombstone_pk], self.categories_hash]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def get_categories_hash(categories_ids):
+    if categories_ids is None:
+        return 'all'
+    return hashlib.md5(repr(sorted(categories_ids)).encode()).hexdigest()
+
+
+def after(field, position):
+    """the keyset condition of the rows after position, ordered by field and pk"""
+
+    time, pk = position
+    if time is None:
+        return Q()
+    if pk is None:
+        return Q(**{field + '__gt': time})
+    return Q(**{field + '__gt': time}) | Q(**{field: time, 'pk__gt': pk})
+
+
+def get_changes(posts, token=None, categories_ids=None, limit=100):
+    """
+    the posts saved and the tombstones of the posts deleted after the token's position,
+    up to limit of each, along with the position after them and whether there are more.
+    posts is the queryset the changed posts are taken from, categories_ids limits them
+    to those categories. raises InvalidSyncToken for tokens that can't be decoded, and
+    ExpiredSyncToken for ones of other categories or older than the retained tombstones,
+    clients have to sync from the start then.
+    """
+
+    until = timezone.now() - SYNC_SETTLE_DELAY
+    categories_hash = get_categories_hash(categories_ids)
+    if token is None:
+        position = SyncPosition.start(until, categories_hash)
+    else:
+        position = SyncPosition.from_token(token)
+        if position.categories_hash != categories_hash \
+                or position.tombstone_position[0] < timezone.now() - TOMBSTONES_RETENTION:
+            raise ExpiredSyncToken
+
+    tombstones = PostTombstone.objects.all()
+    if categories_ids is not None:
+        posts = posts.filter(category_id__in=categories_ids)
+        tombstones = tombstones.filter(category_id__in=categories_ids)
+
+    posts = list(posts.filter(after('updated_at', position.post_position), updated_at__lte=until)
+                 .order_by('updated_at', 'pk')[:limit + 1])
+    tombstones = list(tombstones.filter(after('deleted_at', position.tombstone_position), deleted_at__lte=until)
+                      .order_by('deleted_at', 'pk').values_list('slug', 'deleted_at', 'pk')[:limit + 1])
+
+    has_more = len(posts) > limit or len(tombstones) > limit
+    posts, tombstones = posts[:limit], tombstones[:limit]
+
+    # the client has every change up to until when there are no more of them
+    next_position = SyncPosition((until, None) if len(posts) < limit else (posts[-1].updated_at, posts[-1].pk),
+                                 (until, None) if len(tombstones) < limit else tombstones[-1][1:],
+                                 categories_hash)
+    return posts, [slug for slug, deleted_at, pk in tombstones], next_position.to_token(), has_more
@@ -1,3 +1,874 @@
-from django.test import TestCase
+import importlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image as PILImage
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.cache import get_post_scope, get_version_key
+from core.news_scrapers.ingest import ingest_posts
+from news.clustering import BANDS
+from news.images import ImageCache, get_image
+from news.models import Source, Category, Post, PostTag, Comment, SourceCategory, StoryBucket, ProxiedImage, \
+    Stylesheet
+from news.pagination import TimeStampCursorPagination, RankCursorPagination
+from news.views import SyncView
+
+
+class QueryBudgetTestCase(APITestCase):
+    """pins the number of queries each endpoint may run, so regressions fail the tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='reader', password='password123')
+        cls.token = Token.objects.create(user=cls.user)
+
+        cls.sources = [Source.objects.create(title='Source %d' % index) for index in range(2)]
+        cls.categories = [Category.objects.create(title='Category %d' % index) for index in range(3)]
+        cls.user.favourite_categories.set(cls.categories[:2])
+
+        tags = [PostTag.objects.create(tag='tag %d' % index) for index in range(3)]
+        cls.posts = []
+        for index in range(30):
+            post = Post.objects.create(source=cls.sources[index % 2], category=cls.categories[index % 3],
+                                       title='Post %d' % index, description='description', body='<p>body</p>',
+                                       detail_url='https://example.com/%d' % index,
+                                       timestamp=timezone.now() - timezone.timedelta(minutes=index))
+            post.tags.set(tags)
+            cls.posts.append(post)
+
+        call_command('backfill_source_categories', stdout=StringIO())
+
+        cls.post = cls.posts[0]
+        cls.comments = [Comment.objects.create(user=cls.user, post=cls.post, text='comment %d' % index)
+                        for index in range(5)]
+
+    def setUp(self):
+        cache.clear()
+
+    def authenticate(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    @contextmanager
+    def committed(self):
+        """runs the on_commit callbacks registered inside the block, tests never commit their transaction"""
+
+        start = len(connection.run_on_commit)
+        yield
+        callbacks = connection.run_on_commit[start:]
+        del connection.run_on_commit[start:]
+        for savepoints_ids, callback in callbacks:
+            callback()
+
+
+class NewsQueryBudgetTests(QueryBudgetTestCase):
+    def test_category_posts(self):
+        url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_category_posts_authenticated(self):
+        url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+        self.authenticate()
+
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(post['category']['is_favourited_by_user'] for post in response.data['results']))
+
+    def test_source_posts(self):
+        url = reverse('source-posts', kwargs={'source': self.sources[0].slug,
+                                              'category': self.categories[0].slug})
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_post_detail(self):
+        url = reverse('post-detail', kwargs={'post': self.post.slug})
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['comments_count'], 5)
+
+    def test_comments_list(self):
+        url = reverse('comments-list', kwargs={'post': self.post.slug})
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_create_comment(self):
+        url = reverse('comments-list', kwargs={'post': self.post.slug})
+        self.authenticate()
+
+        with self.assertNumQueries(5):
+            response = self.client.post(url, {'text': 'new comment'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comments_count, 6)
+
+    def test_update_comment(self):
+        url = reverse('comment-detail', kwargs={'post': self.post.slug, 'comment': self.comments[0].slug})
+        self.authenticate()
+
+        with self.assertNumQueries(3):
+            response = self.client.patch(url, {'text': 'edited comment'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['slug'], self.comments[0].slug)
+
+    def test_delete_comment(self):
+        url = reverse('comment-detail', kwargs={'post': self.post.slug, 'comment': self.comments[0].slug})
+        self.authenticate()
+
+        with self.assertNumQueries(4):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comments_count, 4)
+
+    def test_categories_list(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('categories'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_categories_list_authenticated(self):
+        self.authenticate()
+
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('categories'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([category['is_favourited_by_user'] for category in response.data['results']],
+                         [True, True, False])
+
+    def test_sources_list(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('sources'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_source_detail(self):
+        url = reverse('source-detail', kwargs={'source': self.sources[0].slug})
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['categories']), 3)
+
+
+class CountStrategyTests(QueryBudgetTestCase):
+    def test_cached_count(self):
+        url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+        self.authenticate()  # authenticated responses aren't cached, only their counts
+        self.client.get(url)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 10)
+
+        post = Post(source=self.sources[0], category=self.categories[0], title='New post',
+                    detail_url='https://example.com/new', timestamp=timezone.now())
+        ingest_posts(self.sources[0], self.categories[0], [(post, [])])
+
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 11)
+
+    def test_first_page_count(self):
+        url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+        TimeStampCursorPagination.count_strategy = 'first_page'
+        self.addCleanup(setattr, TimeStampCursorPagination, 'count_strategy', 'cached')
+        TimeStampCursorPagination.page_size = 5
+        self.addCleanup(setattr, TimeStampCursorPagination, 'page_size', 20)
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 10)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data['next'])
+        self.assertIsNone(response.data['count'])
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_estimate_count(self):
+        url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+        TimeStampCursorPagination.count_strategy = 'estimate'
+        self.addCleanup(setattr, TimeStampCursorPagination, 'count_strategy', 'cached')
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 10)
+
+    def test_postgres_estimate_count(self):
+        connection = mock.MagicMock(vendor='postgresql')
+        cursor = connection.cursor.return_value.__enter__.return_value
+        queryset = Post.objects.filter(category=self.categories[0])
+        paginator = TimeStampCursorPagination()
+
+        with mock.patch('core.pagination.connections', {'default': connection}):
+            cursor.fetchone.return_value = ('[{"Plan": {"Plan Rows": 250000}}]',)
+            self.assertEqual(paginator.get_estimate_count(queryset), 250000)
+
+            cursor.fetchone.return_value = ([{'Plan': {'Plan Rows': 12}}],)  # exact below the threshold
+            self.assertEqual(paginator.get_estimate_count(queryset), 10)
+
+        self.assertTrue(cursor.execute.call_args[0][0].startswith('EXPLAIN (FORMAT JSON) SELECT'))
+
+    def test_comments_count_not_cached(self):
+        url = reverse('comments-list', kwargs={'post': self.post.slug})
+        self.assertEqual(self.client.get(url).data['count'], 5)
+
+        Comment.objects.create(user=self.user, post=self.post, text='new comment')
+        self.assertEqual(self.client.get(url).data['count'], 6)
+
+class ResponseCacheTests(QueryBudgetTestCase):
+    def test_feed_invalidated_by_ingest(self):
+        url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+        other_url = reverse('category-posts', kwargs={'category': self.categories[1].slug})
+        self.client.get(url)
+        self.client.get(other_url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 10)
+
+        post = Post(source=self.sources[0], category=self.categories[0], title='New post',
+                    detail_url='https://example.com/new', timestamp=timezone.now())
+        ingest_posts(self.sources[0], self.categories[0], [(post, [])])
+
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['slug'], post.slug)
+
+    def test_uncached_requests(self):
+        url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+        TimeStampCursorPagination.page_size = 5
+        self.addCleanup(setattr, TimeStampCursorPagination, 'page_size', 20)
+        response = self.client.get(url)
+        next_url = response.data['next']
+        self.client.get(next_url)
+
+        with self.assertNumQueries(1):
+            self.client.get(next_url)
+
+        self.authenticate()
+        with self.assertNumQueries(3):  # the count is still cached
+            self.client.get(url)
+
+    def test_post_detail_invalidated_by_comments(self):
+        url = reverse('post-detail', kwargs={'post': self.post.slug})
+        self.client.get(url)
+        with self.committed():
+            Comment.objects.create(user=self.user, post=self.post, text='new comment')
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['comments_count'], 6)
+
+    def test_categories_invalidated_by_changes(self):
+        self.client.get(reverse('categories'))
+        category = Category.objects.get(pk=self.categories[0].pk)
+        category.title = 'Renamed category'
+        with self.committed():
+            category.save()
+
+        response = self.client.get(reverse('categories'))
+        self.assertEqual(response.data['results'][0]['title'], 'Renamed category')
+
+    def test_post_deletion(self):
+        post = Post.objects.get(pk=self.posts[3].pk)
+        url = reverse('post-detail', kwargs={'post': post.slug})
+        feed_url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+        self.client.get(url)
+        self.client.get(feed_url)
+
+        with self.committed():
+            post.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(feed_url)
+        self.assertEqual(response.data['count'], 9)
+        self.assertNotIn(post.slug, [result['slug'] for result in response.data['results']])
+
+    def test_post_edit(self):
+        post = Post.objects.get(pk=self.posts[3].pk)
+        feed_url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+        self.client.get(feed_url)
+
+        post.description = 'edited description'
+        with self.committed():
+            post.save()
+            # until the edit is committed, requests still get the cached feed
+            self.assertNotIn('edited description', str(self.client.get(feed_url).data['results']))
+        results = self.client.get(feed_url).data['results']
+        self.assertEqual([result['description'] for result in results if result['slug'] == post.slug],
+                         ['edited description'])
+
+    def test_long_scope_keys(self):
+        key = get_version_key(get_post_scope('خبر-' * 60))
+        self.assertLess(len(key), 250)
+        self.assertTrue(key.isascii())
+
+
+class ConditionalResponseTests(QueryBudgetTestCase):
+    def test_post_detail_etag(self):
+        url = reverse('post-detail', kwargs={'post': self.post.slug})
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.committed():
+            Comment.objects.create(user=self.user, post=self.post, text='new comment')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_feed_last_modified(self):
+        url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+        self.authenticate()
+        self.client.get(url)
+        now = time.time_ns()
+
+        with mock.patch('core.cache.time.time_ns', return_value=now + 2 * 10 ** 9):
+            last_modified = self.client.get(url)['Last-Modified']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 304)
+
+            # publishers' timestamps aren't when posts are saved, some are only dates
+            post = Post(source=self.sources[0], category=self.categories[0], title='New post',
+                        detail_url='https://example.com/new', timestamp=timezone.now() - timezone.timedelta(days=1))
+            ingest_posts(self.sources[0], self.categories[0], [(post, [])])
+
+        with mock.patch('core.cache.time.time_ns', return_value=now + 4 * 10 ** 9):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 11)
+
+    def test_last_modified_in_current_second(self):
+        url = reverse('post-detail', kwargs={'post': self.post.slug})
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('ETag', response)
+
+    def test_post_detail_last_modified(self):
+        url = reverse('post-detail', kwargs={'post': self.post.slug})
+        self.client.get(url)
+        now = time.time_ns()
+
+        with mock.patch('core.cache.time.time_ns', return_value=now + 2 * 10 ** 9):
+            last_modified = self.client.get(url)['Last-Modified']
+            with self.committed():
+                Comment.objects.create(user=self.user, post=self.post, text='new comment')
+
+        with mock.patch('core.cache.time.time_ns', return_value=now + 4 * 10 ** 9):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['comments_count'], 6)
+
+    def test_feed_etag_per_user(self):
+        url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+        etag = self.client.get(url)['ETag']
+
+        self.authenticate()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class IngestTests(QueryBudgetTestCase):
+    def get_page(self, name, size):
+        """scraped posts sharing a new stylesheet, each with an existing and two new tags"""
+
+        stylesheet = Stylesheet(hash=Stylesheet.get_hash(name), content=name)
+        return [(Post(source=self.sources[0], category=self.categories[0], title='%s %d' % (name, index),
+                      detail_url='https://example.com/%s/%d' % (name, index), timestamp=timezone.now(),
+                      thumbnail='https://example.com/%s/%d.jpg' % (name, index), stylesheet=stylesheet),
+                 ['tag 0', '%s tag %d' % (name, index), '%s tag' % name])
+                for index in range(size)]
+
+    def test_query_count(self):
+        for name, size in (('single', 1), ('page', 20)):
+            page = self.get_page(name, size)
+            buckets = [None] * size * BANDS
+            buckets_batches = math.ceil(len(buckets) / connection.ops.bulk_batch_size(
+                ['key', 'post', 'category', 'created_at'], buckets))  # sqlite limits the parameters of a query
+
+            # savepoints included, sqlite also selects the ids bulk_create can't return
+            with self.assertNumQueries(20 + buckets_batches):
+                ingest_posts(self.sources[0], self.categories[0], page)
+            self.assertEqual(Post.objects.filter(detail_url__startswith='https://example.com/%s/' % name,
+                                                 tags__tag='tag 0').count(), size)
+
+        with self.assertNumQueries(1):  # a page of known posts
+            ingest_posts(self.sources[0], self.categories[0], self.get_page('page', 20))
+
+
+class SourceCategoriesTests(QueryBudgetTestCase):
+    def test_backfill(self):
+        source_category = SourceCategory.objects.get(source=self.sources[0], category=self.categories[0])
+        self.assertEqual(source_category.posts_count, 5)
+        self.assertEqual(source_category.latest_timestamp, self.posts[0].timestamp)
+
+    def test_ingest_updates_source_categories(self):
+        timestamp = timezone.now() + timezone.timedelta(minutes=1)
+        posts = [Post(source=self.sources[0], category=self.categories[0], title='New post %d' % index,
+                      detail_url='https://example.com/new/%d' % index, timestamp=timestamp)
+                 for index in range(2)]
+        ingest_posts(self.sources[0], self.categories[0], [(post, []) for post in posts])
+
+        source_category = SourceCategory.objects.get(source=self.sources[0], category=self.categories[0])
+        self.assertEqual(source_category.posts_count, 7)
+        self.assertEqual(source_category.latest_timestamp, timestamp)
+
+        category = Category.objects.create(title='New category')
+        post = Post(source=self.sources[0], category=category, title='New post',
+                    detail_url='https://example.com/new', timestamp=None)
+        ingest_posts(self.sources[0], category, [(post, [])])
+
+        response = self.client.get(reverse('source-detail', kwargs={'source': self.sources[0].slug}))
+        self.assertEqual(response.data['categories'][-1]['slug'], category.slug)
+
+
+class SearchTests(QueryBudgetTestCase):
+    def ingest(self, title, description='', body=''):
+        post = Post(source=self.sources[0], category=self.categories[0], title=title, description=description,
+                    body=body, detail_url='https://example.com/%s' % title, timestamp=timezone.now())
+        ingest_posts(self.sources[0], self.categories[0], [(post, [])])
+        return post
+
+    def search(self, query, **kwargs):
+        return self.client.get(reverse('search'), {'q': query}, **kwargs)
+
+    def test_english_search(self):
+        post = self.ingest('Stock markets rally as oil prices fall')
+
+        response = self.search('market')
+        self.assertEqual([result['slug'] for result in response.data['results']], [post.slug])
+
+    def test_arabic_search(self):
+        post = self.ingest('ارتفاع أسعار البترول في مصر')
+
+        response = self.search('الاسعار')
+        self.assertEqual([result['slug'] for result in response.data['results']], [post.slug])
+
+    def test_ranking(self):
+        body_post = self.ingest('Weather report', body='<p>storm</p>')
+        title_post = self.ingest('Storm hits the coast')
+
+        response = self.search('storm')
+        self.assertEqual([result['slug'] for result in response.data['results']], [title_post.slug, body_post.slug])
+
+    def test_rank_cursor_pagination(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        RankCursorPagination.page_size = 7
+        self.addCleanup(setattr, RankCursorPagination, 'page_size', 20)
+
+        response = self.search('description')
+        self.assertEqual(response.data['count'], 30)
+
+        slugs = []
+        while True:
+            slugs.extend(result['slug'] for result in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(sorted(slugs), sorted(post.slug for post in self.posts))
+
+    def test_search_queries(self):
+        self.ingest('Stock markets rally as oil prices fall')
+
+        with self.assertNumQueries(2):
+            response = self.search('market')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_deleted_posts_unindexed(self):
+        post = self.ingest('Stock markets rally as oil prices fall')
+        Post.objects.get(pk=post.pk).delete()
+
+        self.assertEqual(self.search('market').data['results'], [])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM news_post_search WHERE rowid = %s', [post.pk])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_edited_posts_reindexed(self):
+        post = Post.objects.get(pk=self.ingest('Stock markets rally as oil prices fall').pk)
+        post.title = 'Football season opens'
+        with self.committed():
+            post.save()
+
+        self.assertEqual(self.search('market').data['results'], [])
+        self.assertEqual([result['slug'] for result in self.search('football').data['results']], [post.slug])
+
+    def test_empty_query(self):
+        response = self.search(' ')
+        self.assertEqual(response.data['results'], [])
+
+
+class ExportTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = get_user_model().objects.create_user(username='analytics', password='password123',
+                                                         is_staff=True)
+        cls.admin_token = Token.objects.create(user=cls.admin)
+
+    def export(self, **params):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        response = self.client.get(reverse('export'), params)
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_export(self):
+        with self.assertNumQueries(2):
+            posts = self.export()
+        self.assertEqual([post['slug'] for post in posts], [post.slug for post in reversed(self.posts)])
+        self.assertEqual(posts[-1]['source'], self.sources[0].slug)
+        self.assertEqual(posts[-1]['comments_count'], 5)
+
+    def test_filters(self):
+        since = self.posts[10].timestamp.isoformat()
+        posts = self.export(since=since, source=self.sources[0].slug, category=self.categories[0].slug)
+
+        expected = [post.slug for post in reversed(self.posts[:10])
+                    if post.source == self.sources[0] and post.category == self.categories[0]]
+        self.assertEqual([post['slug'] for post in posts], expected)
+
+    def test_invalid_since(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        response = self.client.get(reverse('export'), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_admins_only(self):
+        self.authenticate()
+        response = self.client.get(reverse('export'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_command(self):
+        output = StringIO()
+        call_command('export_posts', category=self.categories[1].slug, stdout=output)
+
+        posts = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(len(posts), 10)
+        self.assertTrue(all(post['category'] == self.categories[1].slug for post in posts))
+
+
+class SyncTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('news.sync.SYNC_SETTLE_DELAY', timezone.timedelta(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get(reverse('sync'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def sync_all(self, since=None, **params):
+        slugs, deleted = [], []
+        while True:
+            data = self.sync(since, **params)
+            slugs.extend(post['slug'] for post in data['posts'])
+            deleted.extend(data['deleted'])
+            since = data['next']
+            if not data['has_more']:
+                return slugs, deleted, since
+
+    def test_initial_sync(self):
+        with self.assertNumQueries(2):
+            data = self.sync()
+        self.assertEqual(len(data['posts']), 30)
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['has_more'])
+
+    def test_changes(self):
+        token = self.sync()['next']
+        self.assertEqual(self.sync(token)['posts'], [])
+
+        post = Post.objects.get(pk=self.posts[3].pk)
+        post.description = 'edited'
+        post.save()
+        Post.objects.get(pk=self.posts[4].pk).delete()
+
+        data = self.sync(token)
+        self.assertEqual([post['slug'] for post in data['posts']], [post.slug])
+        self.assertEqual(data['deleted'], [self.posts[4].slug])
+
+        data = self.sync(data['next'])
+        self.assertEqual((data['posts'], data['deleted']), ([], []))
+
+    def test_paging(self):
+        SyncView.page_size = 7
+        self.addCleanup(setattr, SyncView, 'page_size', 100)
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[:10]]).delete()
+
+        slugs, deleted, token = self.sync_all()
+        self.assertEqual(sorted(slugs), sorted(post.slug for post in self.posts[10:]))
+        self.assertEqual(deleted, [])
+
+    def test_paged_deletions(self):
+        token = self.sync()['next']
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[:10]]).delete()
+        SyncView.page_size = 3
+        self.addCleanup(setattr, SyncView, 'page_size', 100)
+
+        slugs, deleted, token = self.sync_all(token)
+        self.assertEqual(slugs, [])
+        self.assertEqual(sorted(deleted), sorted(post.slug for post in self.posts[:10]))
+
+    def test_favourites(self):
+        self.authenticate()
+        data = self.sync(favourites='')
+        self.assertEqual(len(data['posts']), 20)
+
+        for post in Post.objects.filter(category=self.categories[2])[:2]:
+            post.delete()
+        Post.objects.filter(category=self.categories[0]).first().delete()
+        self.assertEqual(len(self.sync(data['next'], favourites='')['deleted']), 1)
+
+    def test_favourites_unauthenticated(self):
+        response = self.client.get(reverse('sync'), {'favourites': ''})
+        self.assertEqual(response.status_code, 401)
+
+    def test_expired_token(self):
+        token = self.sync()['next']
+        self.authenticate()
+        response = self.client.get(reverse('sync'), {'since': token, 'favourites': ''})
+        self.assertEqual(response.status_code, 410)
+
+        with mock.patch('news.sync.TOMBSTONES_RETENTION', timezone.timedelta(0)):
+            response = self.client.get(reverse('sync'), {'since': token})
+        self.assertEqual(response.status_code, 410)
+
+    def test_invalid_token(self):
+        response = self.client.get(reverse('sync'), {'since': 'not a token'})
+        self.assertEqual(response.status_code, 400)
+
+
+class StoryClusteringTests(QueryBudgetTestCase):
+    def ingest(self, source, *titles):
+        posts = [(Post(source=source, category=self.categories[0], title=title, description='',
+                       body='', detail_url='https://example.com/%s' % title, timestamp=timezone.now()), [])
+                 for title in titles]
+        return ingest_posts(source, self.categories[0], posts)
+
+    def test_duplicates_across_sources(self):
+        story, = self.ingest(self.sources[0], 'ارتفاع أسعار البترول في مصر اليوم')
+        duplicate, other = self.ingest(self.sources[1], 'مصر: ارتفاع اسعار البترول', 'الأهلي يفوز على الزمالك')
+
+        self.assertEqual((story.story_cluster, story.is_story_duplicate), (story.pk, False))
+        self.assertEqual((duplicate.story_cluster, duplicate.is_story_duplicate), (story.pk, True))
+        self.assertEqual((other.story_cluster, other.is_story_duplicate), (other.pk, False))
+        self.assertEqual(Post.objects.get(pk=duplicate.pk).story_cluster, story.pk)
+
+    def test_duplicates_within_page(self):
+        story, duplicate = self.ingest(self.sources[0], 'Stock markets rally as oil prices fall',
+                                       'Oil prices fall, stock markets rally')
+        self.assertEqual((duplicate.story_cluster, duplicate.is_story_duplicate), (story.pk, True))
+
+    def test_old_posts_not_clustered(self):
+        story, = self.ingest(self.sources[0], 'Stock markets rally as oil prices fall')
+        StoryBucket.objects.update(created_at=timezone.now() - timezone.timedelta(days=3))
+
+        post, = self.ingest(self.sources[1], 'Oil prices fall, stock markets rally')
+        self.assertEqual((post.story_cluster, post.is_story_duplicate), (post.pk, False))
+
+    def test_collapsed_feed(self):
+        story, = self.ingest(self.sources[0], 'Stock markets rally as oil prices fall')
+        duplicate, = self.ingest(self.sources[1], 'Oil prices fall, stock markets rally')
+        url = reverse('category-posts', kwargs={'category': self.categories[0].slug})
+
+        slugs = [post['slug'] for post in self.client.get(url).data['results']]
+        self.assertIn(duplicate.slug, slugs)
+
+        results = self.client.get(url, {'collapse': ''}).data['results']
+        self.assertIn(story.slug, [post['slug'] for post in results])
+        self.assertNotIn(duplicate.slug, [post['slug'] for post in results])
+        self.assertEqual(results[0]['story_cluster'], story.pk)
+
+
+class ImageServer(ThreadingHTTPServer):
+    """a local stand-in for the publishers' image hosts, counting the requests it gets"""
+
+    def __init__(self, images):
+        self.images = images
+        self.requests_count = 0
+        super().__init__(('127.0.0.1', 0), ImageRequestHandler)
+
+    def get_url(self, path):
+        return 'http://127.0.0.1:%d%s' % (self.server_port, path)
+
+
+class ImageRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests_count += 1
+        time.sleep(0.05)  # long enough for concurrent requests of the image to wait on the first one
+
+        if self.path not in self.server.images:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.end_headers()
+        self.wfile.write(self.server.images[self.path])
+
+    def log_message(self, *args):
+        pass
+
+
+class ImageProxyTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        original = BytesIO()
+        PILImage.new('RGB', (1200, 800), 'red').save(original, 'JPEG')
+
+        cls.server = ImageServer({'/photo.jpg': original.getvalue()})
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.requests_count = 0
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings_override = override_settings(IMAGE_CACHE_DIR=cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.url = self.server.get_url('/photo.jpg')
+        self.hash = ProxiedImage.get_hash(self.url)
+        ProxiedImage.objects.create(hash=self.hash, url=self.url)
+
+    def get_image(self, size, accept='image/webp,image/*'):
+        return self.client.get(reverse('image', kwargs={'image_hash': self.hash, 'size': size}), HTTP_ACCEPT=accept)
+
+    def test_variants(self):
+        response = self.get_image('small')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(PILImage.open(BytesIO(response.content)).size, (240, 160))
+
+        response = self.get_image('medium', accept='image/*')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(PILImage.open(BytesIO(response.content)).size, (480, 320))
+        self.assertEqual(self.server.requests_count, 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_image('small').status_code, 200)
+
+    def test_coalesced_fetches(self):
+        threads = [threading.Thread(target=get_image, args=(self.hash, self.url, size, 'jpeg'))
+                   for size in ('small', 'small', 'medium', 'large', 'large')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.server.requests_count, 1)
+
+    def test_missing_images(self):
+        self.assertEqual(self.get_image('huge').status_code, 404)
+        response = self.client.get(reverse('image', kwargs={'image_hash': '0' * 64, 'size': 'small'}))
+        self.assertEqual(response.status_code, 404)
+
+        url = self.server.get_url('/missing.jpg')
+        ProxiedImage.objects.create(hash=ProxiedImage.get_hash(url), url=url)
+        with self.assertLogs('news.views', 'WARNING'):
+            response = self.client.get(reverse('image', kwargs={'image_hash': ProxiedImage.get_hash(url),
+                                                                'size': 'small'}))
+        self.assertEqual(response.status_code, 502)
+
+    def test_lru_eviction(self):
+        image_cache = ImageCache(tempfile.mkdtemp(), max_size=250)
+        self.addCleanup(shutil.rmtree, image_cache.directory)
+
+        for index, name in enumerate(('a', 'b', 'c')):
+            image_cache.set(name, b'x' * 100)
+            os.utime(image_cache.get_path(name), (index, index))
+            if name == 'b':
+                image_cache.get('a')  # a is used after b was saved
+
+        self.assertIsNone(image_cache.get('b'))
+        self.assertIsNotNone(image_cache.get('a'))
+        self.assertIsNotNone(image_cache.get('c'))
+
+    def test_evicted_while_read(self):
+        image_cache = ImageCache(tempfile.mkdtemp(), max_size=250)
+        self.addCleanup(shutil.rmtree, image_cache.directory)
+        image_cache.set('a', b'x' * 100)
+
+        with mock.patch('news.images.os.utime', side_effect=FileNotFoundError):
+            self.assertEqual(image_cache.get('a'), b'x' * 100)
+
+    def test_proxied_urls(self):
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.thumbnail = self.url
+        post.save()
+        url = reverse('category-posts', kwargs={'category': post.category.slug})
+
+        with override_settings(PROXY_POST_IMAGES=True):
+            response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['thumbnail'],
+                         'http://testserver' + reverse('image', kwargs={'image_hash': self.hash, 'size': 'small'}))
+
+
+class MoveStylesMigrationTests(QueryBudgetTestCase):
+    migration = importlib.import_module('news.migrations.0006_move_post_styles_to_stylesheets')
+
+    def get_full_body(self, head, body):
+        return '<!DOCTYPE html><html>' + self.migration.META_TAG + '<head>' + head + self.migration.REQUIRED_STYLE \
+               + '</head><body dir="auto">' + body + '</body></html>'
+
+    def test_round_trip(self):
+        stylesheets = '<link href="/site.css" rel="stylesheet"/><style>p {color: black;}</style>'
+        for index, post in enumerate(self.posts[:2]):
+            head = '<link href="https://example.com/%d" rel="canonical"/>' % index + stylesheets \
+                   + '<link href="https://example.com/amp/%d" rel="amphtml"/>' % index
+            Post.objects.filter(pk=post.pk).update(body=self.get_full_body(head, '<p>body %d</p>' % index),
+                                                   stylesheet=None)
+
+        self.migration.move_styles_to_stylesheets(django_apps, None)
+        posts = list(Post.objects.filter(pk__in=[post.pk for post in self.posts[:2]]).order_by('pk'))
+        self.assertEqual([post.body for post in posts], ['<p>body 0</p>', '<p>body 1</p>'])
+        self.assertEqual(posts[0].stylesheet_id, posts[1].stylesheet_id)
+        self.assertEqual(posts[0].stylesheet.content, stylesheets)
+
+        self.migration.inline_stylesheets(django_apps, None)
+        post = Post.objects.get(pk=self.posts[0].pk)
+        self.assertEqual(post.body, self.get_full_body(stylesheets, '<p>body 0</p>'))
+        self.assertIsNone(post.stylesheet_id)
+
+        self.migration.move_styles_to_stylesheets(django_apps, None)
+        post = Post.objects.get(pk=self.posts[0].pk)
+        self.assertEqual((post.body, post.stylesheet_id), ('<p>body 0</p>', posts[0].stylesheet_id))
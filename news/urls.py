@@ -3,6 +3,10 @@ from django.urls import path
 from news import views
 
 urlpatterns = [
+    path('search/', view=views.SearchView.as_view(), name='search'),
+    path('export/', view=views.ExportPostsView.as_view(), name='export'),
+    path('sync/', view=views.SyncView.as_view(), name='sync'),
+    path('images/<image_hash>/<size>/', view=views.ImageView.as_view(), name='image'),
     path('posts/<post>/', view=views.PostDetailView.as_view(), name='post-detail'),
     path('posts/<post>/comments/', view=views.CommentsView.as_view(
         {'get': 'list', 'post': 'create'}), name='comments-list'
@@ -1,42 +1,83 @@
+import logging
+import re
+
+from django.http import StreamingHttpResponse, HttpResponse, Http404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.translation import ugettext_lazy as _
+from django.views import View
 from rest_framework import generics, mixins
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
+from core.cache import CachedResponseMixin, ConditionalResponseMixin, CATEGORIES_SCOPE, SOURCES_SCOPE, \
+    get_category_scope, get_source_scope, get_source_category_scope, get_post_scope
 from news import serializers
-from news.models import Post, Category, Source, Comment
-from news.pagination import TimeStampCursorPagination, SortCursorPagination
+from news.models import Post, Category, Source, Comment, ProxiedImage
+from news.pagination import TimeStampCursorPagination, SortCursorPagination, CommentsCursorPagination, \
+    RankCursorPagination
+from news.export import get_exported_posts, export_posts, parse_since
+from news.images import IMAGE_SIZES, IMAGE_FORMATS, ImageUnavailable, get_image, get_image_cache, get_variant_name
 from news.permissions import IsOwner
+from news.search import search_posts
+from news.sync import get_changes, InvalidSyncToken, ExpiredSyncToken
+
+logger = logging.getLogger(__name__)
 
 
-class CategoryPostsView(generics.ListAPIView):
+class PostsListView(ConditionalResponseMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = serializers.PostSerializer
     pagination_class = TimeStampCursorPagination
+    cache_scopes = (SOURCES_SCOPE, CATEGORIES_SCOPE)
+    # joins the nested source and category, and skips the body which lists don't show
+    queryset = Post.objects.select_related('source', 'category') \
+        .only('slug', 'title', 'description', 'thumbnail', 'full_image', 'timestamp', 'story_cluster',
+              'source__title', 'source__image', 'source__website',
+              'category__slug', 'category__title', 'category__sort', 'category__image')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if 'collapse' in self.request.query_params:  # only the first post of each story
+            queryset = queryset.filter(is_story_duplicate=False)
+        return queryset
+
+
+class CategoryPostsView(PostsListView):
     authentication_classes = (TokenAuthentication,)
     lookup_url_kwarg = 'category'
-    queryset = Post.objects.all()
+
+    def get_cache_scopes(self):
+        return (get_category_scope(self.kwargs[self.lookup_url_kwarg]),) + self.cache_scopes
 
     def filter_queryset(self, queryset):
         return queryset.filter(category__slug=self.kwargs[self.lookup_url_kwarg])
 
 
-class PostDetailView(generics.RetrieveAPIView):
+class PostDetailView(ConditionalResponseMixin, CachedResponseMixin, generics.RetrieveAPIView):
     lookup_field = 'slug'
     lookup_url_kwarg = 'post'
     serializer_class = serializers.PostDetailSerializer
-    queryset = Post.objects.all()
+    queryset = Post.objects.select_related('source', 'category', 'stylesheet').prefetch_related('tags')
+    cache_scopes = (SOURCES_SCOPE, CATEGORIES_SCOPE)
+
+    def get_cache_scopes(self):
+        return (get_post_scope(self.kwargs[self.lookup_url_kwarg]),) + self.cache_scopes
 
 
-class CategoriesListView(generics.ListAPIView):
+class CategoriesListView(CachedResponseMixin, generics.ListAPIView):
     serializer_class = serializers.CategorySerializer
     authentication_classes = (TokenAuthentication,)
     pagination_class = SortCursorPagination
+    cache_scopes = (CATEGORIES_SCOPE,)
     queryset = Category.objects.all()
 
 
-class SourcesListView(generics.ListAPIView):
+class SourcesListView(CachedResponseMixin, generics.ListAPIView):
     serializer_class = serializers.SourceSerializer
     pagination_class = SortCursorPagination
+    cache_scopes = (SOURCES_SCOPE,)
     queryset = Source.objects.all()
 
 
@@ -48,8 +89,11 @@ class CommentsView(mixins.CreateModelMixin,
     lookup_field = 'slug'
     lookup_url_kwarg = 'comment'
     serializer_class = serializers.CommentSerializer
-    pagination_class = TimeStampCursorPagination
-    queryset = Comment.objects.all()
+    pagination_class = CommentsCursorPagination
+    # the post is joined for its slug, which the comments signals need
+    queryset = Comment.objects.select_related('user', 'post') \
+        .only('slug', 'text', 'timestamp', 'user', 'post', 'post__slug',
+              'user__username', 'user__first_name', 'user__last_name', 'user__profile_photo')
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticatedOrReadOnly, IsOwner)
 
@@ -57,19 +101,114 @@ class CommentsView(mixins.CreateModelMixin,
         return super().filter_queryset(queryset.filter(post__slug=self.kwargs.get('post', '')))
 
 
-class SourceDetailView(generics.RetrieveAPIView):
+class SourceDetailView(CachedResponseMixin, generics.RetrieveAPIView):
     lookup_field = 'slug'
     lookup_url_kwarg = 'source'
     serializer_class = serializers.SourceDetailSerializer
     queryset = Source.objects.all()
+    cache_scopes = (SOURCES_SCOPE, CATEGORIES_SCOPE)
 
+    def get_cache_scopes(self):
+        return (get_source_scope(self.kwargs[self.lookup_url_kwarg]),) + self.cache_scopes
 
-class SourcePostsView(generics.ListAPIView):
-    serializer_class = serializers.PostSerializer
-    pagination_class = TimeStampCursorPagination
-    queryset = Post.objects.all()
+
+class SourcePostsView(PostsListView):
+
+    def get_cache_scopes(self):
+        return (get_source_category_scope(self.kwargs.get('source', ''), self.kwargs.get('category', '')),) \
+               + self.cache_scopes
 
     def filter_queryset(self, queryset):
         source_slug = self.kwargs.get('source', '')
         category_slug = self.kwargs.get('category', '')
         return queryset.filter(source__slug=source_slug, category__slug=category_slug)
+
+
+class SearchView(generics.ListAPIView):
+    serializer_class = serializers.PostSerializer
+    pagination_class = RankCursorPagination
+    queryset = PostsListView.queryset
+
+    def filter_queryset(self, queryset):
+        return search_posts(queryset, self.request.query_params.get('q', ''))
+
+
+class ExportPostsView(APIView):
+    """streams the posts as newline delimited json, for bulk consumers like the analytics job"""
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        try:
+            since = parse_since(since) if since else None
+        except ValueError:
+            return Response(_("Invalid since timestamp"), status=400)
+
+        posts = get_exported_posts(since, request.query_params.get('source'), request.query_params.get('category'))
+        return StreamingHttpResponse(export_posts(posts), content_type='application/x-ndjson')
+
+
+class SyncView(generics.GenericAPIView):
+    """
+    the posts saved and the slugs of the posts deleted since the since token, with the token to
+    sync from next time, for offline clients. clients should apply the deletions before the posts,
+    and keep syncing while has_more is true. with favourites only the posts of the user's favourite
+    categories are synced, tokens of one are expired by the other or by changing the favourites.
+    """
+
+    serializer_class = serializers.PostSerializer
+    authentication_classes = (TokenAuthentication,)
+    page_size = 100
+    queryset = Post.objects.select_related('source', 'category') \
+        .only('slug', 'title', 'description', 'thumbnail', 'full_image', 'timestamp', 'updated_at', 'story_cluster',
+              'source__title', 'source__image', 'source__website',
+              'category__slug', 'category__title', 'category__sort', 'category__image')
+
+    def get(self, request):
+        categories_ids = None
+        if 'favourites' in request.query_params:
+            if not request.user.is_authenticated:
+                self.permission_denied(request)
+            categories_ids = list(request.user.favourite_categories.values_list('pk', flat=True))
+
+        try:
+            posts, deleted, token, has_more = get_changes(self.get_queryset(), request.query_params.get('since'),
+                                                          categories_ids, self.page_size)
+        except InvalidSyncToken:
+            return Response(_("Invalid sync token"), status=400)
+        except ExpiredSyncToken:
+            return Response(_("Expired sync token, sync again without it"), status=410)
+
+        return Response({'posts': self.get_serializer(posts, many=True).data, 'deleted': deleted,
+                         'next': token, 'has_more': has_more})
+
+
+class ImageView(View):
+    """
+    a post image resized to one of IMAGE_SIZES, as webp to clients that accept it and jpeg
+    to the others. served from the disk cache without touching the database once it's made.
+    """
+
+    def get(self, request, image_hash, size):
+        if size not in IMAGE_SIZES or not re.fullmatch('[0-9a-f]{64}', image_hash):
+            raise Http404
+
+        image_format = 'webp' if 'image/webp' in request.META.get('HTTP_ACCEPT', '') else 'jpeg'
+        data = get_image_cache().get(get_variant_name(image_hash, size, image_format))
+
+        if data is None:
+            url = ProxiedImage.objects.filter(hash=image_hash).values_list('url', flat=True).first()
+            if url is None:
+                raise Http404
+            try:
+                data = get_image(image_hash, url, size, image_format)
+            except ImageUnavailable as error:
+                logger.warning('Could not proxy image %s: %s', url, error)
+                return HttpResponse(status=502)
+
+        response = HttpResponse(data, content_type=IMAGE_FORMATS[image_format][1])
+        patch_cache_control(response, public=True, max_age=30 * 24 * 60 * 60)  # the variants never change
+        patch_vary_headers(response, ('Accept',))
+        return response
@@ -1,3 +1,95 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from core.news_scrapers.ingest import ingest_posts
+from news.models import Category, Post
+from news.tests import QueryBudgetTestCase
+
+
+class UsersQueryBudgetTests(QueryBudgetTestCase):
+    def test_signup(self):
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('signup'), {'username': 'writer', 'password': 'password123'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_token(self):
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('token'), {'username': 'reader', 'password': 'password123'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_me(self):
+        self.authenticate()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('me'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_me(self):
+        self.authenticate()
+
+        with self.assertNumQueries(2):
+            response = self.client.patch(reverse('me'), {'first_name': 'Reader'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_favourite_categories(self):
+        self.authenticate()
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('favourite-categories'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+    def test_update_favourite_categories(self):
+        self.authenticate()
+        categories = [category.slug for category in Category.objects.all()]
+
+        with self.assertNumQueries(4):
+            response = self.client.put(reverse('favourite-categories'), {'categories': categories},
+                                       format='json')
+        self.assertEqual(response.status_code, 204)
+
+    def test_user_profile(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user-profile', kwargs={'username': self.user.username}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['username'], get_user_model().objects.get().username)
+
+
+class FeedTests(QueryBudgetTestCase):
+    def test_feed(self):
+        self.authenticate()
+
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('feed'))
+        self.assertEqual(response.status_code, 200)
+
+        favourite_posts = [post for post in self.posts if post.category in self.categories[:2]]
+        self.assertEqual([post['slug'] for post in response.data['results']],
+                         [post.slug for post in favourite_posts])
+        self.assertTrue(all(post['category']['is_favourited_by_user'] for post in response.data['results']))
+
+    def test_feed_requires_authentication(self):
+        response = self.client.get(reverse('feed'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_cached_first_page(self):
+        self.authenticate()
+        self.client.get(reverse('feed'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('feed'))
+        self.assertEqual(response.data['count'], 20)
+
+        post = Post(source=self.sources[0], category=self.categories[1], title='New post',
+                    detail_url='https://example.com/new', timestamp=timezone.now())
+        ingest_posts(self.sources[0], self.categories[1], [(post, [])])
+
+        response = self.client.get(reverse('feed'))
+        self.assertEqual(response.data['results'][0]['slug'], post.slug)
+
+        self.client.put(reverse('favourite-categories'), {'categories': [self.categories[2].slug]}, format='json')
+
+        response = self.client.get(reverse('feed'))
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual({post['category']['slug'] for post in response.data['results']}, {self.categories[2].slug})
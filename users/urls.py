@@ -7,5 +7,6 @@ urlpatterns = [
     path('token/', view=views.CreateTokenView.as_view(), name='token'),
     path('me/', view=views.ManageUserView.as_view(), name='me'),
     path('me/favourite-categories/', view=views.FavouriteCategoriesView.as_view(), name='favourite-categories'),
+    path('me/feed/', view=views.FeedView.as_view(), name='feed'),
     path('<username>/', view=views.ReadOnlyUserView.as_view(), name='user-profile'),
 ]
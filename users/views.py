@@ -1,12 +1,15 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import generics, permissions, authentication
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from core.cache import CATEGORIES_SCOPE, bump_versions, get_versions, get_favourites_scope, get_category_scope
 from news.models import Category
 from news.serializers import CategorySerializer
+from news.views import PostsListView
 from users.serializers import UserProfileSerializer
 
 
@@ -48,9 +51,45 @@ class FavouriteCategoriesView(generics.ListAPIView, generics.UpdateAPIView):
                 return Response(_("Invalid category slug"), status=404)
 
             user.favourite_categories.set(categories)
+            bump_versions(get_favourites_scope(user.pk))
             return Response(status=204)
         else:
             return Response(_("Invalid Data"), status=400)
 
     def get_queryset(self):
         return self.request.user.favourite_categories.all()
+
+
+class FeedView(PostsListView):
+    """the posts of the user's favourite categories, newest first"""
+
+    authentication_classes = (authentication.TokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+    cache_per_user = True
+
+    def get_favourite_categories(self):
+        """the (pk, slug) pairs of the user's favourite categories, cached until they or the categories change"""
+
+        if not hasattr(self, '_favourite_categories'):
+            user = self.request.user
+            versions = get_versions((get_favourites_scope(user.pk), CATEGORIES_SCOPE))
+            key = 'favourite-categories:%s:%s' % (user.pk, ':'.join(str(version) for version in versions))
+
+            self._favourite_categories = cache.get(key)
+            if self._favourite_categories is None:
+                self._favourite_categories = list(user.favourite_categories.order_by().values_list('pk', 'slug'))
+                cache.set(key, self._favourite_categories, self.cache_timeout)
+
+        return self._favourite_categories
+
+    def get_cache_scopes(self):
+        return (get_favourites_scope(self.request.user.pk),) \
+               + tuple(get_category_scope(slug) for pk, slug in self.get_favourite_categories()) + self.cache_scopes
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['favourite_categories_ids'] = {pk for pk, slug in self.get_favourite_categories()}
+        return context
+
+    def filter_queryset(self, queryset):
+        return queryset.filter(category_id__in=[pk for pk, slug in self.get_favourite_categories()])